@@ -0,0 +1,173 @@
+import asyncio
+import gzip
+import io
+import itertools
+import logging
+import os
+import re
+import time
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from typing import BinaryIO, Deque, Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:  # zstd необязателен, без него используется gzip
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+COMPRESSION_SUFFIXES = {"zstd": ".zst", "gzip": ".gz", None: ""}
+
+# Имена, которые создает архиватор; ротация не трогает остальные файлы каталога
+ARCHIVE_NAME_RE = re.compile(r"_\d{8}_\d{6}_\d{6}_\d+_\d+\.\w+(\.gz|\.zst)?$")
+
+
+def resolve_compression(compression: Optional[str]) -> Optional[str]:
+    """Выбирает алгоритм сжатия: "auto" - zstd при наличии пакета zstandard, иначе gzip"""
+    if compression == "auto":
+        return "zstd" if zstandard else "gzip"
+    if compression == "zstd" and not zstandard:
+        raise ValueError("Для сжатия zstd установите пакет zstandard")
+    if compression not in COMPRESSION_SUFFIXES:
+        raise ValueError(f"Неизвестный алгоритм сжатия: {compression}")
+    return compression
+
+
+def compress(content: bytes, compression: Optional[str]) -> bytes:
+    if compression == "zstd":
+        return zstandard.ZstdCompressor().compress(content)
+    if compression == "gzip":
+        return gzip.compress(content, compresslevel=6)
+    return content
+
+
+def open_decompressed(f: BinaryIO, compression: Optional[str]) -> BinaryIO:
+    """Оборачивает открытый файл для чтения с распаковкой (склеенные фреймы читаются подряд)"""
+    if compression == "zstd":
+        return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(f, read_across_frames=True))
+    if compression == "gzip":
+        return gzip.GzipFile(fileobj=f)
+    return f
+
+
+def read_archived(path: Path) -> bytes:
+    """Читает архивный файл, распаковывая его по расширению"""
+    content = Path(path).read_bytes()
+    if str(path).endswith(".gz"):
+        return gzip.decompress(content)
+    if str(path).endswith(".zst"):
+        if not zstandard:
+            raise ValueError("Для чтения .zst установите пакет zstandard")
+        return zstandard.ZstdDecompressor().decompressobj().decompress(content)
+    return content
+
+
+class ResponseArchiver:
+    """Фоновое сохранение сырых ответов API на диск.
+
+    Ответы ставятся в очередь без блокировки запроса и записываются отдельной
+    задачей в потоке. Тело сохраняется как есть (без повторной сериализации),
+    имена файлов уникальны даже для одновременных запросов, старые файлы
+    удаляются при превышении max_files, max_bytes или max_age (в секундах).
+    """
+
+    def __init__(
+        self,
+        directory: str = "api_responses",
+        compression: Optional[str] = "auto",
+        max_files: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        max_age: Optional[float] = None,
+        queue_size: int = 1000,
+    ):
+        self.directory = Path(directory)
+        self.compression = resolve_compression(compression)
+        self.max_files = max_files
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.queue_size = queue_size
+        self.dropped = 0
+        self._counter = itertools.count()
+        self._queue: Optional[asyncio.Queue] = None
+        self._writer: Optional[asyncio.Task] = None
+        self._files: Optional[Deque[Tuple[Path, int, float]]] = None
+        self._total_bytes = 0
+
+    def submit(self, kind: str, content: bytes, extension: str = "json") -> None:
+        """Ставит ответ в очередь на запись; при переполненной очереди ответ отбрасывается"""
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.queue_size)
+            self._writer = asyncio.create_task(self._run())
+        name = self._make_name(kind, extension)
+        try:
+            self._queue.put_nowait((name, content))
+        except asyncio.QueueFull:
+            self.dropped += 1
+            logger.warning(f"Очередь архива переполнена, ответ {name} не сохранен")
+
+    def _make_name(self, kind: str, extension: str) -> str:
+        # Микросекунды + счетчик процесса исключают перезапись при одновременных запросах
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        suffix = COMPRESSION_SUFFIXES[self.compression]
+        return f"{kind}_{timestamp}_{os.getpid()}_{next(self._counter)}.{extension}{suffix}"
+
+    async def _run(self) -> None:
+        while True:
+            item = await self._queue.get()
+            try:
+                if item is None:
+                    return
+                await asyncio.to_thread(self._write, *item)
+            except Exception as e:
+                logger.error(f"Ошибка сохранения ответа в архив: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _write(self, name: str, content: bytes) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        if self._files is None:
+            self._files = self._scan()
+        data = compress(content, self.compression)
+        path = self.directory / name
+        tmp_path = path.with_name(path.name + ".tmp")
+        tmp_path.write_bytes(data)
+        tmp_path.replace(path)
+        self._files.append((path, len(data), time.time()))
+        self._total_bytes += len(data)
+        self._rotate()
+
+    def _scan(self) -> Deque[Tuple[Path, int, float]]:
+        """Собирает уже существующие файлы архива, от старых к новым"""
+        files = []
+        for path in self.directory.iterdir():
+            if path.is_file() and ARCHIVE_NAME_RE.search(path.name):
+                stat = path.stat()
+                files.append((path, stat.st_size, stat.st_mtime))
+        files.sort(key=lambda item: item[2])
+        self._total_bytes = sum(size for _, size, _ in files)
+        return deque(files)
+
+    def _rotate(self) -> None:
+        now = time.time()
+        while self._files and (
+            (self.max_files is not None and len(self._files) > self.max_files)
+            or (self.max_bytes is not None and self._total_bytes > self.max_bytes)
+            or (self.max_age is not None and now - self._files[0][2] > self.max_age)
+        ):
+            path, size, _ = self._files.popleft()
+            self._total_bytes -= size
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+    async def aclose(self) -> None:
+        """Дописывает все ответы из очереди и останавливает запись"""
+        if self._queue is None:
+            return
+        await self._queue.put(None)
+        await self._writer
+        self._queue = None
+        self._writer = None
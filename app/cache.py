@@ -0,0 +1,199 @@
+import asyncio
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+from urllib.parse import urlencode
+
+# TTL (в секундах) по префиксу параметра url запроса к entrypoint API
+DEFAULT_TTLS = {
+    "/product/": 300,
+    "/seller/": 900,
+}
+
+
+@dataclass
+class CacheEntry:
+    body: bytes
+    stored_at: float
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+
+class ResponseCache:
+    """Кэш ответов API: LRU в памяти и SQLite на диске.
+
+    Ключ - URL и отсортированные параметры запроса. Свежие записи (моложе
+    TTL эндпоинта) отдаются без запроса, устаревшие с ETag/Last-Modified
+    перепроверяются условным запросом. path=None отключает дисковый уровень.
+    Асинхронные методы (aget, astore, arefresh) выполняют запросы к SQLite
+    в потоке, чтобы не останавливать цикл событий.
+    """
+
+    def __init__(
+        self,
+        path: Optional[Union[str, Path]] = "cache/responses.sqlite",
+        memory_size: int = 1024,
+        ttls: Optional[Dict[str, float]] = None,
+        default_ttl: float = 300,
+    ):
+        self.memory_size = memory_size
+        self.ttls = DEFAULT_TTLS if ttls is None else ttls
+        self.default_ttl = default_ttl
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self._memory: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        # Отдельные блокировки: обращение к SQLite в потоке не задерживает попадания в память
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._db = None
+        if path is not None:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(path), check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, body BLOB NOT NULL, stored_at REAL NOT NULL, "
+                "etag TEXT, last_modified TEXT)"
+            )
+            self._db.commit()
+
+    @staticmethod
+    def make_key(url: str, params: Optional[Dict[str, Any]] = None) -> str:
+        """Ключ кэша: URL и параметры в каноническом порядке"""
+        items = sorted((str(key), str(value)) for key, value in (params or {}).items())
+        return f"{url}?{urlencode(items)}"
+
+    def ttl_for(self, params: Optional[Dict[str, Any]] = None) -> float:
+        page_url = str((params or {}).get("url", ""))
+        for prefix, ttl in self.ttls.items():
+            if page_url.startswith(prefix):
+                return ttl
+        return self.default_ttl
+
+    def is_fresh(self, entry: CacheEntry, params: Optional[Dict[str, Any]] = None) -> bool:
+        return time.time() - entry.stored_at < self.ttl_for(params)
+
+    @staticmethod
+    def conditional_headers(entry: CacheEntry) -> Dict[str, str]:
+        headers = {}
+        if entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+        return headers
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        entry = self._get_memory(key)
+        if entry is None and self._db is not None:
+            entry = self._load(key)
+        return entry
+
+    async def aget(self, key: str) -> Optional[CacheEntry]:
+        entry = self._get_memory(key)
+        if entry is None and self._db is not None:
+            entry = await asyncio.to_thread(self._load, key)
+        return entry
+
+    def set(self, key: str, entry: CacheEntry) -> None:
+        with self._lock:
+            self._remember(key, entry)
+        self._save(key, entry)
+
+    async def aset(self, key: str, entry: CacheEntry) -> None:
+        with self._lock:
+            self._remember(key, entry)
+        if self._db is not None:
+            await asyncio.to_thread(self._save, key, entry)
+
+    @staticmethod
+    def make_entry(body: bytes, headers: Any) -> CacheEntry:
+        """Запись кэша с валидаторами из заголовков ответа"""
+        return CacheEntry(
+            body=body,
+            stored_at=time.time(),
+            etag=headers.get("ETag"),
+            last_modified=headers.get("Last-Modified"),
+        )
+
+    def store(self, key: str, body: bytes, headers: Any) -> CacheEntry:
+        """Сохраняет тело ответа вместе с валидаторами из заголовков"""
+        entry = self.make_entry(body, headers)
+        self.set(key, entry)
+        return entry
+
+    async def astore(self, key: str, body: bytes, headers: Any) -> CacheEntry:
+        entry = self.make_entry(body, headers)
+        await self.aset(key, entry)
+        return entry
+
+    def refresh(self, key: str, entry: CacheEntry) -> None:
+        """Продлевает запись после ответа 304 Not Modified"""
+        entry.stored_at = time.time()
+        self.set(key, entry)
+
+    async def arefresh(self, key: str, entry: CacheEntry) -> None:
+        entry.stored_at = time.time()
+        await self.aset(key, entry)
+
+    def _get_memory(self, key: str) -> Optional[CacheEntry]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+            return entry
+
+    def _load(self, key: str) -> Optional[CacheEntry]:
+        """Читает запись из SQLite и помещает ее в память"""
+        with self._db_lock:
+            if self._db is None:
+                return None
+            row = self._db.execute(
+                "SELECT body, stored_at, etag, last_modified FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        entry = CacheEntry(body=row[0], stored_at=row[1], etag=row[2], last_modified=row[3])
+        with self._lock:
+            self._remember(key, entry)
+        return entry
+
+    def _save(self, key: str, entry: CacheEntry) -> None:
+        with self._db_lock:
+            if self._db is None:
+                return
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, body, stored_at, etag, last_modified) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, entry.body, entry.stored_at, entry.etag, entry.last_modified),
+            )
+            self._db.commit()
+
+    def _remember(self, key: str, entry: CacheEntry) -> None:
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "revalidated": self.revalidated,
+            "memory_entries": len(self._memory),
+        }
+
+    def close(self) -> None:
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def __enter__(self) -> "ResponseCache":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
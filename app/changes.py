@@ -0,0 +1,125 @@
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Union
+
+import jsonlib
+from models import ProductDetails
+from records import price_fingerprint
+
+PRICE_FIELDS = ('original', 'discount', 'discount_percent', 'final', 'card_price')
+
+
+@dataclass(slots=True)
+class PriceChange:
+    """Изменение относительно последнего известного состояния"""
+    kind: str  # 'added', 'removed' или 'repriced'
+    sku_id: str
+    seller_id: Optional[str]
+    old_price: Optional[Dict[str, Any]] = None
+    new_price: Optional[Dict[str, Any]] = None
+    name: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'kind': self.kind,
+            'sku_id': self.sku_id,
+            'seller_id': self.seller_id,
+            'name': self.name,
+            'old_price': self.old_price,
+            'new_price': self.new_price,
+        }
+
+
+def _price_dict(values: List[Any]) -> Dict[str, Any]:
+    return dict(zip(PRICE_FIELDS, values))
+
+
+class ChangeDetector:
+    """Инкрементальное сравнение свежих данных с последним известным состоянием.
+
+    Состояние - словарь SKU -> [seller_id, отпечаток цены, поля цены].
+    Каждая страница или товар сравнивается по SKU и отпечатку за O(1) на товар,
+    наружу отдаются только добавленные и переоцененные товары, а после
+    завершения обхода (finish) - пропавшие. Состояние можно хранить в JSON файле.
+    """
+
+    def __init__(self, state_path: Optional[Union[str, Path]] = None,
+                 on_change: Optional[Callable[[PriceChange], None]] = None):
+        self.state_path = Path(state_path) if state_path else None
+        self.on_change = on_change
+        self.state: Dict[str, list] = {}
+        self._seen: Set[str] = set()
+        self._seen_sellers: Set[str] = set()
+        if self.state_path and self.state_path.exists():
+            self.state = jsonlib.loads(self.state_path.read_bytes())
+
+    def diff_products(self, products: Iterable[Any]) -> List[PriceChange]:
+        """Сравнивает товары (Product, ProductRecord или ProductDetails) с состоянием и обновляет его"""
+        changes = []
+        for product in products:
+            if isinstance(product, ProductDetails):
+                sku_id, seller_id = str(product.sku_id or product.id), product.seller.get('id')
+            else:
+                sku_id, seller_id = str(product.sku_id), product.seller_id
+            if not sku_id:
+                continue
+            price = product.price
+            fingerprint = price_fingerprint(price)
+            self._seen.add(sku_id)
+            if seller_id:
+                self._seen_sellers.add(seller_id)
+
+            previous = self.state.get(sku_id)
+            if previous is not None and previous[1] == fingerprint:
+                continue
+            values = [getattr(price, field) for field in PRICE_FIELDS]
+            self.state[sku_id] = [seller_id, fingerprint, *values]
+            change = PriceChange(
+                kind='added' if previous is None else 'repriced',
+                sku_id=sku_id,
+                seller_id=seller_id,
+                old_price=_price_dict(previous[2:]) if previous is not None else None,
+                new_price=_price_dict(values),
+                name=product.name,
+            )
+            changes.append(change)
+            if self.on_change:
+                self.on_change(change)
+        return changes
+
+    def diff_page(self, page: Any) -> List[PriceChange]:
+        return self.diff_products(page.products)
+
+    def write_page(self, page: Any) -> int:
+        """Позволяет использовать детектор как приемник страниц при обходе"""
+        self.diff_page(page)
+        return len(page.products)
+
+    def finish(self, seller_ids: Optional[Iterable[str]] = None) -> List[PriceChange]:
+        """Завершает обход: товары продавцов seller_ids (по умолчанию - встреченных
+        в обходе), которые не попались ни на одной странице, считаются удаленными.
+        Вызывать только после полного обхода: при пропущенных страницах их товары
+        тоже попадут в удаленные."""
+        sellers = set(seller_ids) if seller_ids is not None else self._seen_sellers
+        removed = [
+            sku_id for sku_id, entry in self.state.items()
+            if entry[0] in sellers and sku_id not in self._seen
+        ]
+        changes = []
+        for sku_id in removed:
+            entry = self.state.pop(sku_id)
+            change = PriceChange(kind='removed', sku_id=sku_id, seller_id=entry[0], old_price=_price_dict(entry[2:]))
+            changes.append(change)
+            if self.on_change:
+                self.on_change(change)
+        self._seen.clear()
+        self._seen_sellers.clear()
+        return changes
+
+    def save(self) -> None:
+        if not self.state_path:
+            return
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.state_path.with_name(self.state_path.name + ".tmp")
+        tmp_path.write_bytes(jsonlib.dumps(self.state))
+        tmp_path.replace(self.state_path)
@@ -0,0 +1,91 @@
+import logging
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Union
+
+import jsonlib
+
+logger = logging.getLogger(__name__)
+
+
+class CrawlCheckpoint:
+    """Файл контрольной точки загрузки продавца.
+
+    Хранит totalPages с первой страницы, разметку списка, в которой загружались
+    страницы, номера загруженных и неудачных страниц, размер выходного файла после последней записанной страницы и
+    число записанных в него товаров.
+    Сохраняется атомарно (через временный файл) после каждой страницы.
+    """
+
+    def __init__(self, path: Union[str, Path], seller_id: Optional[str] = None):
+        self.path = Path(path)
+        self.seller_id = seller_id
+        self.total_pages: Optional[int] = None
+        self.page_layout: Optional[Dict[str, Any]] = None
+        self.completed: Set[int] = set()
+        self.failed: Set[int] = set()
+        self.output_size = 0
+        self.items_written = 0
+
+    @classmethod
+    def load(cls, path: Union[str, Path], seller_id: Optional[str] = None) -> "CrawlCheckpoint":
+        """Загружает контрольную точку; если файла нет или он от другого продавца - возвращает пустую"""
+        checkpoint = cls(path, seller_id)
+        if not checkpoint.path.exists():
+            return checkpoint
+        try:
+            state = jsonlib.loads(checkpoint.path.read_bytes())
+        except (OSError, *jsonlib.DECODE_ERRORS) as e:
+            logger.warning(f"Контрольная точка {path} повреждена, загрузка начнется заново: {e}")
+            return checkpoint
+        if seller_id and state.get('seller_id') not in (None, seller_id):
+            logger.warning(f"Контрольная точка {path} относится к продавцу {state.get('seller_id')}, игнорируем")
+            return checkpoint
+        checkpoint.seller_id = state.get('seller_id') or seller_id
+        checkpoint.total_pages = state.get('total_pages')
+        checkpoint.page_layout = state.get('page_layout')
+        checkpoint.completed = set(state.get('completed_pages', []))
+        checkpoint.failed = set(state.get('failed_pages', []))
+        checkpoint.output_size = state.get('output_size', 0)
+        checkpoint.items_written = state.get('items_written', 0)
+        return checkpoint
+
+    @property
+    def started(self) -> bool:
+        return self.total_pages is not None
+
+    def pending_pages(self) -> List[int]:
+        """Страницы, которые еще не загружены (включая неудачные)"""
+        if not self.total_pages:
+            return []
+        return [page for page in range(1, self.total_pages + 1) if page not in self.completed]
+
+    def mark_completed(self, page: int, output_size: int, items: int = 0) -> None:
+        if page not in self.completed:
+            self.items_written += items
+        self.completed.add(page)
+        self.failed.discard(page)
+        self.output_size = output_size
+
+    def mark_failed(self, page: int) -> None:
+        if page not in self.completed:
+            self.failed.add(page)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'seller_id': self.seller_id,
+            'total_pages': self.total_pages,
+            'page_layout': self.page_layout,
+            'completed_pages': sorted(self.completed),
+            'failed_pages': sorted(self.failed),
+            'output_size': self.output_size,
+            'items_written': self.items_written,
+        }
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        tmp_path.write_bytes(jsonlib.dumps(self.to_dict()))
+        tmp_path.replace(self.path)
+
+    def remove(self) -> None:
+        self.path.unlink(missing_ok=True)
@@ -0,0 +1,20 @@
+import os
+
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import sessionmaker
+
+from models import Base
+
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./ozon_prices.db")
+
+
+def create_db_engine(url: str = None) -> Engine:
+    """Создает движок БД (по умолчанию DATABASE_URL) и недостающие таблицы"""
+    engine = create_engine(url or DATABASE_URL)
+    Base.metadata.create_all(engine)
+    return engine
+
+
+def create_session_factory(engine: Engine) -> sessionmaker:
+    return sessionmaker(bind=engine, autoflush=False)
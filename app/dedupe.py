@@ -0,0 +1,70 @@
+import hashlib
+import math
+from typing import Any
+
+
+class SkuSet:
+    """Множество встреченных SKU.
+
+    Числовые SKU хранятся как int: это заметно компактнее строк при
+    миллионах товаров. add возвращает True, если SKU встречен впервые.
+    """
+
+    def __init__(self):
+        self._items: set = set()
+
+    @staticmethod
+    def _key(sku: Any) -> Any:
+        sku = str(sku)
+        return int(sku) if sku.isdigit() else sku
+
+    def add(self, sku: Any) -> bool:
+        key = self._key(sku)
+        if key in self._items:
+            return False
+        self._items.add(key)
+        return True
+
+    def __contains__(self, sku: Any) -> bool:
+        return self._key(sku) in self._items
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+class BloomFilter:
+    """Фильтр Блума для SKU с фиксированным объемом памяти.
+
+    Для очень больших обходов вместо SkuSet: память не растет с числом SKU,
+    но с вероятностью error_rate новый SKU будет принят за уже встреченный.
+    """
+
+    def __init__(self, capacity: int = 1_000_000, error_rate: float = 0.001):
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, sku: Any):
+        digest = hashlib.blake2b(str(sku).encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, sku: Any) -> bool:
+        new = False
+        bits = self.bits
+        for position in self._positions(sku):
+            mask = 1 << (position & 7)
+            if not bits[position >> 3] & mask:
+                bits[position >> 3] |= mask
+                new = True
+        if new:
+            self.count += 1
+        return new
+
+    def __contains__(self, sku: Any) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(sku))
+
+    def __len__(self) -> int:
+        return self.count
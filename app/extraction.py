@@ -0,0 +1,115 @@
+import asyncio
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+import jsonlib
+from extractor import FetchError, ResponseExtractor
+from metrics import Metrics
+from models import PageResult, ProductDetails
+from records import PageRecord
+
+logger = logging.getLogger(__name__)
+
+# Экстракторы процесса-воркера по значению compact, создаются при первом обращении.
+# В отличие от OzonParser они не открывают HTTP клиент и не читают settings.json
+_worker_extractors: Dict[bool, ResponseExtractor] = {}
+
+
+def _extractor(compact: bool) -> ResponseExtractor:
+    if compact not in _worker_extractors:
+        _worker_extractors[compact] = ResponseExtractor(compact=compact)
+    return _worker_extractors[compact]
+
+
+def _loads(extractor: ResponseExtractor, body: bytes, what: str) -> Dict[str, Any]:
+    try:
+        return jsonlib.loads(body)
+    except jsonlib.DECODE_ERRORS as e:
+        extractor.metrics.inc("errors", kind="json")
+        raise FetchError("json", f"Ошибка при разборе JSON {what}: {e}") from e
+
+
+def _run(extractor: ResponseExtractor, func: Callable[[], Any]) -> Tuple[Any, Dict, Optional[FetchError]]:
+    """Выполняет извлечение и возвращает (результат, счетчики метрик воркера, ошибка)"""
+    metrics = extractor.metrics
+    metrics.reset()
+    try:
+        return func(), dict(metrics.counters), None
+    except FetchError as e:
+        return None, dict(metrics.counters), e
+
+
+def extract_page(body: bytes, seller_id: str, page: int = 1,
+                 compact: bool = False) -> Tuple[Any, Dict, Optional[FetchError]]:
+    """Разбирает сырой ответ страницы продавца в процессе-воркере"""
+    extractor = _extractor(compact)
+    return _run(extractor, lambda: extractor._build_page(_loads(extractor, body, "страницы"), seller_id, page))
+
+
+def extract_product(body: bytes, description_body: Optional[bytes], product_id: str,
+                    profile: str = "full", compact: bool = False) -> Tuple[Any, Dict, Optional[FetchError]]:
+    """Разбирает сырые ответы товара (основной и описание) в процессе-воркере"""
+    extractor = _extractor(compact)
+
+    def run() -> Optional[ProductDetails]:
+        data = _loads(extractor, body, "товара")
+        description_data = None
+        if description_body:
+            try:
+                description_data = _loads(extractor, description_body, "описания")
+            except FetchError as e:
+                # Без описания товар все равно собирается
+                logger.error(str(e))
+        return extractor._build_product(extractor._merge_description(data, description_data), product_id, profile)
+
+    return _run(extractor, run)
+
+
+class ExtractionPool:
+    """Пул процессов для CPU-емкого разбора ответов при больших обходах.
+
+    Парсер передает в пул сырые байты ответа, воркеры разбирают JSON, извлекают
+    товары и возвращают готовые записи (PageRecord или PageResult - по compact
+    парсера) вместе со счетчиками метрик (widget_decodes, products_extracted, errors),
+    которые добавляются в metrics парсера. Цикл событий при этом занят только
+    сетью, а пропускная способность разбора растет с числом ядер.
+    """
+
+    def __init__(self, workers: Optional[int] = None):
+        self.workers = workers or os.cpu_count() or 1
+        self.executor = ProcessPoolExecutor(max_workers=self.workers)
+
+    async def _submit(self, metrics: Optional[Metrics], func: Callable, *args: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        result, counters, error = await loop.run_in_executor(self.executor, func, *args)
+        if metrics is not None:
+            metrics.merge_counters(counters)
+        if error is not None:
+            raise error
+        return result
+
+    async def extract_page(self, body: bytes, seller_id: str, page: int = 1, metrics: Optional[Metrics] = None,
+                           compact: bool = False) -> Optional[Union[PageResult, PageRecord]]:
+        """Страница продавца; при ошибке разбора JSON - None"""
+        try:
+            return await self._submit(metrics, extract_page, body, seller_id, page, compact)
+        except FetchError as e:
+            logger.error(str(e))
+            return None
+
+    async def extract_product(self, body: bytes, description_body: Optional[bytes], product_id: str,
+                              profile: str = "full", metrics: Optional[Metrics] = None,
+                              compact: bool = False) -> Optional[ProductDetails]:
+        """Товар; при ошибке разбора основного ответа выбрасывает FetchError"""
+        return await self._submit(metrics, extract_product, body, description_body, product_id, profile, compact)
+
+    def close(self) -> None:
+        self.executor.shutdown()
+
+    def __enter__(self) -> "ExtractionPool":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
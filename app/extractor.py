@@ -0,0 +1,756 @@
+import html
+import logging
+import re
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Union
+
+import jsonlib
+from metrics import Metrics
+from models import Product, Price, Pagination, PageResult, ProductDetails, Characteristic
+from prices import parse_prices, to_rubles, discount
+from records import PriceRecord, ProductRecord, PageRecord
+from widgets import WidgetIndex
+
+logger = logging.getLogger(__name__)
+
+# Профили полей товара. Название, бренд и категория извлекаются всегда;
+# блок описания (второй запрос pdpPage2column) загружается только для профиля с description
+PRODUCT_PROFILES = {
+    "price": frozenset({"price", "seller"}),
+    "card": frozenset({"price", "seller", "images", "rating"}),
+    "full": frozenset({"price", "seller", "images", "rating", "characteristics", "description"}),
+}
+
+# Поля, для которых schema.org разметка служит запасным источником
+SCHEMA_FIELDS = frozenset({"images", "rating", "characteristics"})
+
+
+class FetchError(Exception):
+    """Причина неудачной загрузки: kind совпадает с меткой счетчика errors
+    (transport, http_N, json, html, request, extract)"""
+
+    def __init__(self, kind: str, message: str):
+        # args в порядке __init__: исключение передается из процессов пула через pickle
+        super().__init__(kind, message)
+        self.kind = kind
+        self.message = message
+
+    def __str__(self) -> str:
+        return self.message
+
+
+class ResponseExtractor:
+    """Извлечение товаров, пагинации и карточек из разобранных ответов API.
+
+    Не держит сетевого состояния: OzonParser наследует его и добавляет HTTP,
+    а процессы пула извлечения (extraction.py) используют его напрямую.
+    """
+
+    def __init__(self, compact: bool = False, metrics: Optional[Metrics] = None,
+                 seller_id: Optional[str] = None):
+        self.seller_id = seller_id
+        # Длительности стадий, объем трафика и счетчики ошибок (metrics.py)
+        self.metrics = metrics or Metrics()
+        # Компактный режим: товары страниц собираются в dataclass-записи (records.py) без валидации Pydantic
+        self.compact = compact
+        self._price_cls = PriceRecord if compact else Price
+        self._product_cls = ProductRecord if compact else Product
+        self.logger = logging.getLogger(__name__)
+
+    def _shared_catalog(self, data: dict) -> Dict[str, Any]:
+        """Блок catalog из shared (shared приходит строкой JSON)"""
+        shared = data.get('shared', '{}')
+        shared_data = jsonlib.loads(shared) if isinstance(shared, (str, bytes)) else shared
+        return (shared_data or {}).get('catalog', {})
+
+    def _extract_pagination_info(self, data: dict, page: int = 1, items_count: Optional[int] = None) -> Pagination:
+        """Extract pagination information from API response.
+
+        current_page - номер запрошенной страницы (или currentPage из ответа),
+        items_per_page - pageSize из ответа, а без него число карточек на странице
+        (items_count). Без totalPages число страниц вычисляется из totalFound по
+        pageSize или по числу карточек первой страницы: последняя страница бывает
+        неполной и дала бы завышенное число страниц.
+        """
+        try:
+            # Извлекаем информацию о пагинации из catalog
+            catalog = self._shared_catalog(data)
+            total_found = catalog.get('totalFound', 0)
+            total_pages = catalog.get('totalPages', 0)
+            page_size = catalog.get('pageSize') or 0
+            items_per_page = page_size or items_count or 0
+            size = page_size or (items_count if page == 1 else 0)
+            if not total_pages and total_found and size:
+                total_pages = -(-total_found // size)
+            
+            return Pagination(
+                current_page=catalog.get('currentPage') or page,
+                total_pages=total_pages,
+                items_per_page=items_per_page,
+                total_items=total_found
+            )
+        except Exception as e:
+            print(f"Ошибка извлечения пагинации: {e}")
+            return None
+
+    def _extract_categories(self, data: Dict[str, Any], widgets: Optional[WidgetIndex] = None) -> Dict[str, str]:
+        """Извлекает информацию о категориях из filtersDesktop виджета"""
+        categories = {}
+        try:
+            # Ищем виджет с фильтрами
+            widgets = widgets or WidgetIndex.from_response(data)
+            filters_data = widgets.get('filtersDesktop')
+            
+            if filters_data is None:
+                print("filtersDesktop widget not found")
+                return {}
+            
+            # Ищем секцию с фильтром категорий
+            for section in filters_data.get('sections', []):
+                for filter_data in section.get('filters', []):
+                    if filter_data.get('type') == 'categoryFilter':
+                        category_filter = filter_data.get('categoryFilter', {})
+                        # Извлекаем категории
+                        for category in category_filter.get('categories', []):
+                            title = category.get('title', '')
+                            url_value = category.get('urlValue', '')
+                            level = category.get('level', 0)
+                            
+                            # Берем только категории нулевого уровня (основные)
+                            if level == 0 and title:
+                                categories[title] = {
+                                    'url': url_value,
+                                    'level': level
+                                }
+                        break  # Прерываем поиск после нахождения фильтра категорий
+            
+            if not categories:
+                print("No categories found in filters")
+                # Создаем дефолтную категорию
+                categories["Все товары"] = {
+                    'url': 'default',
+                    'level': 0
+                }
+            
+            return categories
+        
+        except Exception as e:
+            print(f"Ошибка извлечения категорий: {e}")
+            import traceback
+            traceback.print_exc()
+            return {"Все товары": {'url': 'default', 'level': 0}}
+
+    def _extract_price_info(self, price_data: dict) -> Union[Price, PriceRecord]:
+        """Extract price information from product data."""
+        try:
+            if not price_data:
+                return self._price_cls(original=0, final=None, card_price=0)
+
+            # Получаем цены из priceV2
+            prices = price_data.get('price', [])
+            if not prices:
+                return self._price_cls(original=0, final=None, card_price=0)
+
+            # Цена по карте (бывшая финальная цена) и оригинальная цена, в копейках
+            card_price, original_price = (parse_prices(price.get('text') for price in prices[:2]) + [None])[:2]
+            if card_price is None:
+                return self._price_cls(original=0, final=None, card_price=0)
+            if original_price is None:
+                original_price = card_price
+
+            # Вычисляем скидку и процент скидки
+            discount_amount, discount_percent = discount(original_price, card_price)
+
+            return self._price_cls(
+                original=to_rubles(original_price),
+                final=None,
+                card_price=to_rubles(card_price),
+                discount=to_rubles(discount_amount),
+                discount_percent=discount_percent
+            )
+        except Exception as e:
+            print(f"Ошибка извлечения цен: {e}")
+            return self._price_cls(original=0, final=None, card_price=0)
+
+    def _extract_product_info(self, item: dict, seller_id: Optional[str] = None) -> Product:
+        """Extract product information from widget."""
+        name = item.get('title', '')
+        category = None
+        
+        # Try to get category from labelList
+        label_list = item.get('labelList', [])
+        if label_list:
+            for label in label_list:
+                if 'text' in label and 'category' in label.get('textColor', '').lower():
+                    category = label['text']
+                    break
+        
+        # If category not found in labelList, try to find in actions
+        if not category and 'action' in item:
+            action = item.get('action', {})
+            if isinstance(action, dict) and 'link' in action:
+                link = action['link']
+                # Look for category in URL
+                if '/category/' in link:
+                    category_parts = link.split('/category/')
+                    if len(category_parts) > 1:
+                        category = category_parts[1].split('/')[0].replace('-', ' ').title()
+
+        # Extract price info
+        price_info = self._extract_price_info(item)
+        
+        # Create Price object
+        price = Price(
+            original=price_info.original,
+            discount=price_info.discount,
+            final=price_info.final,
+            card_price=price_info.card_price,
+            discount_percent=price_info.discount_percent
+        )
+        
+        return Product(
+            name=name,
+            category=category,
+            price=price,
+            seller_id=seller_id or self.seller_id or '',
+            quantity=item.get('quantity', 0),
+            rating=item.get('rating', 0),
+            reviews=item.get('reviewCount', 0),
+            images=item.get('images', [])
+        )
+
+    def _extract_products(self, data: Dict[str, Any], seller_id: str,
+                          widgets: Optional[WidgetIndex] = None) -> List[Union[Product, ProductRecord]]:
+        """Извлекает список товаров из ответа API"""
+        products = []
+        try:
+            widgets = widgets or WidgetIndex.from_response(data)
+            
+            # Получаем категории
+            categories = self._extract_categories(data, widgets)
+            
+            # Ищем виджет с результатами поиска
+            if 'searchResultsV2' not in widgets:
+                logger.error("searchResultsV2 widget not found")
+                return []
+            
+            widget_data = widgets.get('searchResultsV2')
+            if widget_data is None:
+                logger.error("Failed to parse searchResultsV2 widget data")
+                return []
+            
+            items = widget_data.get('items', [])
+            
+            # Обрабатываем каждый товар
+            for item in items:
+                try:
+                    # Получаем основные данные товара из mainState
+                    main_state = item.get('mainState', [])
+                    title = None
+                    price_data = None
+                    rating = None
+                    reviews = None
+                    
+                    for state in main_state:
+                        if state.get('type') == 'atom' and state.get('id') == 'name':
+                            title = state.get('atom', {}).get('textAtom', {}).get('text', '')
+                        elif state.get('type') == 'atom' and state.get('id') == 'atom':
+                            price_data = state.get('atom', {}).get('priceV2', {})
+                        elif state.get('atom', {}).get('type') == 'labelList':
+                            label_list = state.get('atom', {}).get('labelList', {}).get('items', [])
+                            for label in label_list:
+                                if label.get('icon', {}).get('image') == 'ic_s_star_filled_compact':
+                                    rating = float(label.get('title', '0').strip())
+                                elif label.get('icon', {}).get('image') == 'ic_s_dialog_filled_compact':
+                                    reviews_text = label.get('title', '0')
+                                    reviews = int(''.join(filter(str.isdigit, reviews_text)))
+                    
+                    # Получаем категорию из action и сопоставляем с извлеченными категориями
+                    action = item.get('action', {})
+                    category = None
+                    if isinstance(action, dict) and 'link' in action:
+                        link = action['link']
+                        # Ищем соответствующую категорию по URL
+                        for cat_name, cat_data in categories.items():
+                            if cat_data['url'] in link:
+                                category = cat_name
+                                break
+                    
+                    # Если категория не найдена, используем "Все товары"
+                    if not category:
+                        category = "Все товары"
+                    
+                    # Получаем количество товара из multiButton
+                    multi_button = item.get('multiButton', {})
+                    ozon_button = multi_button.get('ozonButton', {})
+                    button_data = ozon_button.get('addToCartButtonWithQuantity', {})
+                    quantity = button_data.get('maxItems', 0)
+                    
+                    # Получаем изображения
+                    tile_image = item.get('tileImage', {})
+                    images = [img.get('image', {}).get('link') for img in tile_image.get('items', [])]
+                    
+                    # Получаем цены
+                    price = self._extract_price_info(price_data)
+                    
+                    # Получаем skuId
+                    sku_id = item.get('skuId', '')
+                    
+                    # Создаем объект Product
+                    if title:  # Создаем продукт только если есть название
+                        product = self._product_cls(
+                            name=html.unescape(title),
+                            category=category,
+                            price=price,
+                            seller_id=seller_id,
+                            quantity=quantity,
+                            rating=rating or 0.0,
+                            reviews=reviews or 0,
+                            images=images,
+                            sku_id=sku_id
+                        )
+                        products.append(product)
+                except Exception as e:
+                    logger.error(f"Error processing item: {e}")
+                    continue
+                    
+        except Exception as e:
+            logger.error(f"Ошибка извлечения списка товаров: {e}")
+            import traceback
+            logger.error(traceback.format_exc())
+        
+        return products
+
+    def _decode(self, body: bytes) -> Dict[str, Any]:
+        with self.metrics.time("decode"):
+            return jsonlib.loads(body)
+
+    def _extract_next_page(self, data: Dict[str, Any], widgets: WidgetIndex) -> Optional[str]:
+        """Адрес следующей страницы списка из ответа: nextPage верхнего уровня, из shared или виджета paginator"""
+        next_page = data.get('nextPage') or self._shared_catalog(data).get('nextPage')
+        if next_page:
+            return next_page
+        for paginator in widgets.get_all('paginator'):
+            # На странице бывает несколько пагинаторов (например, отзывы) - нужен пагинатор списка продавца
+            next_page = paginator.get('nextPage') if isinstance(paginator, dict) else None
+            if next_page and next_page.startswith('/seller/'):
+                return next_page
+        return None
+
+    def _build_page(self, data: Dict[str, Any], seller_id: str, page: int = 1) -> Optional[Union[PageResult, PageRecord]]:
+        """Собирает результат страницы из разобранного ответа"""
+        # Извлекаем список товаров (индекс виджетов строится один раз на ответ)
+        widgets = WidgetIndex.from_response(data)
+        with self.metrics.time("extract_products"):
+            products = self._extract_products(data, seller_id, widgets)
+        self.metrics.inc("widget_decodes", widgets.decode_count)
+        self.metrics.inc("products_extracted", len(products))
+
+        # Ответ без списка товаров (капча, заглушка антибота) - неудачная страница, а не пустая
+        tiles = widgets.get('searchResultsV2') if 'searchResultsV2' in widgets else None
+        if not isinstance(tiles, dict):
+            return None
+
+        # Извлекаем информацию о пагинации: считаются все карточки, включая пропущенные без названия
+        pagination = self._extract_pagination_info(data, page, len(tiles.get('items', [])))
+        if not pagination:
+            return None
+
+        page_cls = PageRecord if self.compact else PageResult
+        return page_cls(
+            pagination=pagination,
+            products=products,
+            metadata={
+                "seller_id": seller_id,
+                "parsed_at": datetime.now().isoformat(),
+                "url": f"https://www.ozon.ru/seller/magazin-{seller_id}/products/",
+                "next_page": self._extract_next_page(data, widgets)
+            }
+        )
+
+    def _extract_product_details(self, data: Dict[str, Any], product_id: str,
+                                 widgets: Optional[WidgetIndex] = None,
+                                 profile: str = "full") -> Optional[ProductDetails]:
+        """Извлекает детальную информацию о продукте из ответа API.
+
+        profile задает набор полей (PRODUCT_PROFILES): виджеты и ветки разбора
+        для полей вне профиля пропускаются.
+        """
+        try:
+            fields = PRODUCT_PROFILES[profile]
+
+            # Получаем schema.org разметку (нужна только как запасной источник)
+            schema_data = None
+            if fields & SCHEMA_FIELDS:
+                seo_data = data.get('seo', {})
+                if isinstance(seo_data, str):
+                    try:
+                        seo_data = jsonlib.loads(seo_data)
+                    except jsonlib.DECODE_ERRORS:
+                        seo_data = {}
+                
+                for script in seo_data.get('script', []):
+                    if script.get('type') == 'application/ld+json':
+                        try:
+                            schema_data = jsonlib.loads(script.get('innerHTML', '{}'))
+                            break
+                        except jsonlib.DECODE_ERRORS:
+                            continue
+
+            # Получаем виджеты по типу, не завися от числовых ID в ключах; JSON разбирается только у нужных
+            widgets = widgets or WidgetIndex.from_response(data)
+            price_widget = widgets.get('webPrice')
+            seller_widget = widgets.get('webStickyProducts')
+            gallery_widget = widgets.get('webGallery') if 'images' in fields else None
+            reviews_widget = widgets.get('webReviewProductScore') if 'rating' in fields else None
+            if 'characteristics' in fields:
+                characteristics_widget = widgets.get('webCharacteristics')
+                short_characteristics_widget = widgets.get('webShortCharacteristics')
+            else:
+                characteristics_widget = short_characteristics_widget = None
+
+            # Получаем базовую информацию из layoutTrackingInfo
+            try:
+                layout_info = jsonlib.loads(data.get('layoutTrackingInfo', '{}')) if isinstance(data.get('layoutTrackingInfo'), str) else data.get('layoutTrackingInfo', {})
+            except jsonlib.DECODE_ERRORS:
+                layout_info = {}
+            
+            category_name = layout_info.get('categoryName')
+            
+            # Извлекаем название и бренд
+            name = ''
+            description = ''
+            brand = None
+
+            # Получаем бренд из иерархии категорий
+            hierarchy = layout_info.get('hierarchy', '')
+            if hierarchy:
+                brand = hierarchy.split('/')[-1]
+
+            # Получаем название из webAspects
+            aspects = widgets.get('webAspects')
+            
+            product_name = ''
+            
+            if aspects:
+                try:
+                    if aspects.get('aspects'):
+                        variants = aspects['aspects'][0].get('variants', [])
+                        for variant in variants:
+                            if variant.get('active'):
+                                product_name = variant.get('data', {}).get('title', '')
+                                break
+                
+                except (AttributeError, IndexError, TypeError) as e:
+                    self.logger.error(f"Ошибка парсинга webAspects: {e}")
+
+            # Очищаем название от HTML-сущностей и лишних пробелов
+            if product_name:
+                product_name = html.unescape(product_name.strip())
+                product_name = ' '.join(product_name.split())
+
+            # Извлекаем цены
+            price = Price(original=0.0, final=None, card_price=None)
+            is_available = None
+            
+            # Пробуем получить цены из price_widget
+            if price_widget:
+                try:
+                    if isinstance(price_widget, dict):
+                        is_available = price_widget.get('isAvailable')
+                        # Цены считаются в копейках, в модель записываются рубли
+                        current_price = price_widget.get('price', '0')
+                        final, original, card = (
+                            kopecks or 0 for kopecks in parse_prices((
+                                current_price,
+                                price_widget.get('originalPrice', current_price),
+                                price_widget.get('cardPrice', '0'),
+                            ))
+                        )
+
+                        if original == 0 and final > 0:
+                            original = final
+
+                        price.final = to_rubles(final)
+                        price.original = to_rubles(original)
+                        price.card_price = to_rubles(card)
+
+                        show_original_price = price_widget.get('showOriginalPrice', False)
+                        if show_original_price:
+                            discount_amount, price.discount_percent = discount(original, final)
+                            price.discount = to_rubles(discount_amount)
+
+                except Exception as e:
+                    self.logger.error(f"Ошибка при извлечении цен из price_widget: {e}")
+                    import traceback
+                    self.logger.error(traceback.format_exc())
+
+            # Извлекаем информацию о продавце
+            seller_data = seller_widget.get('seller', {}) if seller_widget else {}
+            seller = {
+                'id': seller_data.get('link', '').split('/')[-2] if seller_data.get('link') else None,
+                'name': seller_data.get('name'),
+                'logo': seller_data.get('logoImageUrl'),
+                'link': seller_data.get('link')
+            }
+            
+            # Извлекаем изображения
+            images = []
+            if gallery_widget:
+                cover_image = gallery_widget.get('coverImage')
+                if cover_image:
+                    images.append(cover_image)
+                gallery_images = [img.get('src') for img in gallery_widget.get('images', [])]
+                images.extend(gallery_images)
+            
+            # Если изображения не найдены в галерее, пробуем взять из schema.org
+            if not images and schema_data and 'images' in fields:
+                schema_images = schema_data.get('image')
+                if isinstance(schema_images, str):
+                    images.append(schema_images)
+                elif isinstance(schema_images, list):
+                    images.extend(schema_images)
+            
+            # Извлекаем рейтинг и отзывы
+            rating = 0.0
+            reviews_count = 0
+            if reviews_widget:
+                rating = float(reviews_widget.get('totalScore', 0))
+                reviews_count = int(reviews_widget.get('reviewsCount', 0))
+            elif schema_data and 'rating' in fields and 'aggregateRating' in schema_data:
+                agg_rating = schema_data['aggregateRating']
+                if isinstance(agg_rating, dict):
+                    rating = float(agg_rating.get('ratingValue', 0))
+                    reviews_count = int(agg_rating.get('reviewCount', 0))
+            
+            # Извлекаем характеристики
+            characteristics = []
+            
+            # Сначала пробуем извлечь из webShortCharacteristics
+            if short_characteristics_widget:
+                try:
+                    # Проверяем новый формат характеристик
+                    if isinstance(short_characteristics_widget, dict) and 'characteristics' in short_characteristics_widget:
+                        for char in short_characteristics_widget['characteristics']:
+                            # Получаем название характеристики
+                            title_rs = char.get('title', {}).get('textRs', [])
+                            name = ''
+                            for text_block in title_rs:
+                                if text_block.get('type') == 'text':
+                                    name = text_block.get('content', '')
+                                    break
+                            
+                            # Получаем значения характеристики
+                            values = []
+                            for value_obj in char.get('values', []):
+                                if 'text' in value_obj:
+                                    values.append(value_obj['text'])
+                            
+                            # Объединяем все значения в одну строку
+                            value = ', '.join(str(v) for v in values if v)
+                            
+                            if name and value:
+                                characteristics.append(Characteristic(name=name, value=value))
+                    # Старый формат характеристик
+                    else:
+                        for char in short_characteristics_widget.get('characteristics', []):
+                            name = char.get('name', '')
+                            values = []
+                            
+                            # Собираем значения из разных возможных форматов
+                            if 'value' in char:
+                                values.append(str(char['value']))
+                            elif 'values' in char:
+                                if isinstance(char['values'], list):
+                                    values.extend(str(v) for v in char['values'])
+                                else:
+                                    values.append(str(char['values']))
+                            elif 'text' in char:
+                                values.append(str(char['text']))
+                            
+                            # Если есть единицы измерения, добавляем их
+                            if char.get('unit'):
+                                values = [f"{v} {char['unit']}" for v in values]
+                            
+                            # Объединяем все значения в одну строку
+                            value = ', '.join(str(v) for v in values if v)
+                            
+                            if name and value:
+                                characteristics.append(Characteristic(name=name, value=value))
+                except Exception as e:
+                    self.logger.error(f"Ошибка при извлечении коротких характеристик: {e}")
+                    import traceback
+                    self.logger.error(traceback.format_exc())
+            
+            # Если характеристики не найдены, пробуем извлечь из webCharacteristics
+            if not characteristics and characteristics_widget:
+                try:
+                    for group in characteristics_widget.get('characteristics', []):
+                        for char in group.get('short', []):
+                            name = char.get('name', '')
+                            value = char.get('value', '')
+                            if name and value:
+                                characteristics.append(Characteristic(name=name, value=str(value)))
+                except Exception as e:
+                    self.logger.error(f"Ошибка при извлечении полных характеристик: {e}")
+            
+            # Если характеристики все еще не найдены, пробуем извлечь из schema.org
+            if not characteristics and schema_data and 'characteristics' in fields:
+                try:
+                    for prop_name, prop_value in schema_data.items():
+                        if prop_name.startswith('additional') and isinstance(prop_value, (str, int, float)):
+                            characteristics.append(Characteristic(
+                                name=prop_name.replace('additional', '').strip(),
+                                value=str(prop_value)
+                            ))
+                except Exception as e:
+                    self.logger.error(f"Ошибка при извлечении характеристик из schema.org: {e}")
+
+            # Извлекаем описание товара
+            description = ''
+            # Ищем виджет с описанием: на странице их несколько, текст лежит в том, где есть richAnnotation
+            description_widgets = widgets.get_all('webDescription') if 'description' in fields else []
+            description_widget = next(
+                (widget for widget in description_widgets
+                 if isinstance(widget, dict) and ('richAnnotationJson' in widget or 'richAnnotation' in widget)),
+                description_widgets[0] if description_widgets else None
+            )
+            
+            if description_widget is not None:
+                try:
+                    if isinstance(description_widget, dict):
+                        # Проверяем наличие richAnnotationJson
+                        rich_annotation = description_widget.get('richAnnotationJson', {})
+                        if rich_annotation:
+                            text_blocks = []
+                            
+                            def extract_text_from_blocks(blocks):
+                                for block in blocks:
+                                    # Извлекаем текст из title
+                                    if 'title' in block:
+                                        title_content = block['title'].get('content', [])
+                                        if isinstance(title_content, list):
+                                            text_blocks.extend(title_content)
+                                    
+                                    # Извлекаем текст из text.content
+                                    if 'text' in block:
+                                        text_data = block['text']
+                                        if isinstance(text_data, dict) and 'content' in text_data:
+                                            content = text_data['content']
+                                            if isinstance(content, list):
+                                                text_blocks.extend(content)
+                                        elif isinstance(text_data, list):
+                                            text_blocks.extend(text_data)
+                            
+                            # Обрабатываем основной контент
+                            for content_block in rich_annotation.get('content', []):
+                                # Проверяем наличие blocks
+                                if 'blocks' in content_block:
+                                    extract_text_from_blocks(content_block['blocks'])
+                                # Проверяем text и title напрямую
+                                if 'text' in content_block:
+                                    text_data = content_block['text']
+                                    if isinstance(text_data, dict) and 'content' in text_data:
+                                        text_blocks.extend(text_data['content'])
+                                if 'title' in content_block:
+                                    title_data = content_block['title']
+                                    if isinstance(title_data, dict) and 'content' in title_data:
+                                        text_blocks.extend(title_data['content'])
+                            
+                            # Фильтруем и объединяем текстовые блоки
+                            text_blocks = [block for block in text_blocks if block and isinstance(block, str)]
+                            description = '\n'.join(text_blocks)
+                        
+                        # Проверяем наличие HTML-формата описания
+                        elif 'richAnnotation' in description_widget:
+                            html_description = description_widget.get('richAnnotation', '')
+                            if html_description:
+                                # Заменяем HTML-теги на переносы строк
+                                description = html_description.replace('<br>', '\n')
+                                # Удаляем возможные оставшиеся HTML-теги
+                                description = re.sub(r'<[^>]+>', '', description)
+                        
+                        # Если richAnnotationJson не найден, пробуем старый формат
+                        else:
+                            content = description_widget.get('content', [])
+                            text_blocks = []
+                            
+                            def extract_text_from_content(content_items):
+                                for item in content_items:
+                                    if isinstance(item, dict):
+                                        if 'text' in item:
+                                            text_blocks.append(item['text'])
+                                        if 'content' in item and isinstance(item['content'], list):
+                                            extract_text_from_content(item['content'])
+                                        if 'textRs' in item:
+                                            for text_item in item['textRs']:
+                                                if text_item.get('type') == 'text':
+                                                    text_blocks.append(text_item.get('content', ''))
+                            
+                            extract_text_from_content(content)
+                            description = '\n'.join(text_blocks)
+                        
+                        # Очищаем описание
+                        description = html.unescape(description.strip())
+                        description = ' '.join(description.split())
+
+                except Exception as e:
+                    self.logger.error(f"Ошибка при извлечении описания из виджета: {e}")
+                    import traceback
+                    self.logger.error(traceback.format_exc())
+
+            if 'description' not in fields:
+                description = None
+            elif not description:
+                self.logger.warning("Описание товара не найдено")
+
+            # Создаем и возвращаем объект ProductDetails
+            product_details = ProductDetails(
+                id=product_id,
+                name=product_name,
+                brand=brand,
+                category=category_name,
+                price=price,
+                seller=seller,
+                characteristics=characteristics,
+                description=description,
+                images=images,
+                rating=rating,
+                reviews_count=reviews_count,
+                quantity=0,
+                is_available=is_available,
+                sku_id=product_id,
+                parsed_at=datetime.now(),
+                url=f"https://www.ozon.ru/product/{product_id}/"
+            )
+            
+            self.logger.info(f"Создан объект ProductDetails с названием: {product_details.name}")
+            return product_details
+
+        except Exception as e:
+            self.logger.error(f"Ошибка при извлечении деталей продукта: {e}")
+            import traceback
+            self.logger.error(traceback.format_exc())
+            return None
+
+    @staticmethod
+    def _merge_description(data: Dict[str, Any], description_data: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Добавляет виджеты описания из description_data в основные данные"""
+        if description_data:
+            main_widget_states = data.get('widgetStates', {})
+            desc_widget_states = description_data.get('widgetStates', {})
+            
+            for key in WidgetIndex(desc_widget_states).keys('webDescription'):
+                main_widget_states[key] = desc_widget_states[key]
+            data['widgetStates'] = main_widget_states
+        return data
+
+    def _build_product(self, data: Dict[str, Any], product_id: str, profile: str = "full") -> Optional[ProductDetails]:
+        """Извлекает товар из объединенного ответа с учетом метрик"""
+        widgets = WidgetIndex.from_response(data)
+        with self.metrics.time("extract_product_details"):
+            product_details = self._extract_product_details(data, product_id, widgets, profile)
+        self.metrics.inc("widget_decodes", widgets.decode_count)
+        if not product_details:
+            self.metrics.inc("errors", kind="extract")
+        return product_details
@@ -0,0 +1,78 @@
+import json
+import os
+from pathlib import Path
+from typing import Any, Callable, Optional, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+# Порядок предпочтения бэкендов; stdlib json доступен всегда
+PREFERRED_BACKENDS = ("orjson", "msgspec", "json")
+
+
+def available_backends() -> list:
+    modules = {"orjson": orjson, "msgspec": msgspec, "json": json}
+    return [name for name in PREFERRED_BACKENDS if modules[name] is not None]
+
+
+# Исключения, которые может выбросить loads любого бэкенда
+DECODE_ERRORS = (ValueError, msgspec.DecodeError) if msgspec else (ValueError,)
+
+_backend = "json"
+
+
+def set_backend(name: str) -> None:
+    """Переключает бэкенд JSON ("orjson", "msgspec" или "json")"""
+    global _backend
+    if name not in available_backends():
+        raise ValueError(f"JSON бэкенд {name} недоступен, установлены: {available_backends()}")
+    _backend = name
+
+
+def get_backend() -> str:
+    return _backend
+
+
+def loads(data: Union[str, bytes], backend: Optional[str] = None) -> Any:
+    """Разбирает JSON из строки или байтов выбранным бэкендом"""
+    backend = backend or _backend
+    if backend == "orjson":
+        return orjson.loads(data)
+    if backend == "msgspec":
+        return msgspec.json.decode(data)
+    return json.loads(data)
+
+
+def dumps(obj: Any, indent: bool = False, default: Callable[[Any], Any] = str,
+          backend: Optional[str] = None) -> bytes:
+    """Сериализует объект в UTF-8 JSON (не-ASCII символы не экранируются).
+
+    orjson и stdlib пропускают datetime через default (по умолчанию str),
+    msgspec всегда пишет datetime в ISO формате.
+    """
+    backend = backend or _backend
+    if backend == "orjson":
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=default, option=option)
+    if backend == "msgspec":
+        data = msgspec.json.encode(obj, enc_hook=default)
+        return msgspec.json.format(data, indent=2) if indent else data
+    return json.dumps(obj, ensure_ascii=False, indent=2 if indent else None, default=default).encode("utf-8")
+
+
+def dump_file(obj: Any, path: Union[str, Path], indent: bool = True) -> None:
+    """Сохраняет объект в JSON файл"""
+    Path(path).write_bytes(dumps(obj, indent=indent))
+
+
+# Бэкенд по умолчанию: OZON_JSON_BACKEND из окружения или самый быстрый из установленных
+set_backend(os.environ.get("OZON_JSON_BACKEND") or available_backends()[0])
@@ -0,0 +1,149 @@
+import bisect
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Sequence, Tuple
+
+import jsonlib
+
+# Границы корзин гистограмм в секундах
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Гистограмма длительностей с фиксированными корзинами (как в Prometheus)"""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # последняя корзина - +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> float:
+        """Оценка квантиля сверху - граница корзины, в которую он попадает"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'mean': self.sum / self.count if self.count else 0.0,
+            'p50': self.quantile(0.5),
+            'p95': self.quantile(0.95),
+            'max': self.max,
+        }
+
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+
+class Metrics:
+    """Метрики горячего пути парсера.
+
+    Гистограммы длительности по стадиям (http, decode, extract_*, save, write)
+    и счетчики с метками (bytes_received, widget_decodes, errors{kind=...}).
+    Экспорт - текстовый формат Prometheus или JSON сводка по итогам запуска.
+    """
+
+    def __init__(self, prefix: str = "ozon_parser", buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.prefix = prefix
+        self.buckets = tuple(buckets)
+        self.histograms: Dict[str, Histogram] = {}
+        self.counters: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+
+    def observe(self, stage: str, seconds: float) -> None:
+        histogram = self.histograms.get(stage)
+        if histogram is None:
+            histogram = self.histograms[stage] = Histogram(self.buckets)
+        histogram.observe(seconds)
+
+    @contextmanager
+    def time(self, stage: str) -> Iterator[None]:
+        """Замеряет длительность блока; время учитывается и при исключении"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - started)
+
+    def inc(self, name: str, value: float = 1, **labels: Any) -> None:
+        key = (name, tuple(sorted((label, str(label_value)) for label, label_value in labels.items())))
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def counter(self, name: str, **labels: Any) -> float:
+        """Значение счетчика; без меток - сумма по всем меткам"""
+        if labels:
+            key = (name, tuple(sorted((label, str(value)) for label, value in labels.items())))
+            return self.counters.get(key, 0)
+        return sum(value for (counter_name, _), value in self.counters.items() if counter_name == name)
+
+    def merge_counters(self, counters: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float]) -> None:
+        """Добавляет счетчики, собранные в другом процессе (например, в пуле извлечения)"""
+        for key, value in counters.items():
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def reset(self) -> None:
+        self.histograms.clear()
+        self.counters.clear()
+
+    def to_prometheus(self) -> str:
+        """Метрики в текстовом формате Prometheus"""
+        lines = []
+        name = f"{self.prefix}_stage_seconds"
+        if self.histograms:
+            lines.append(f"# TYPE {name} histogram")
+        for stage, histogram in sorted(self.histograms.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, histogram.counts):
+                cumulative += count
+                lines.append(f'{name}_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{stage="{stage}",le="+Inf"}} {histogram.count}')
+            lines.append(f'{name}_sum{{stage="{stage}"}} {histogram.sum}')
+            lines.append(f'{name}_count{{stage="{stage}"}} {histogram.count}')
+        typed = set()
+        for (counter_name, labels), value in sorted(self.counters.items()):
+            full_name = f"{self.prefix}_{counter_name}_total"
+            if full_name not in typed:
+                lines.append(f"# TYPE {full_name} counter")
+                typed.add(full_name)
+            lines.append(f"{full_name}{_format_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> Dict[str, Any]:
+        """JSON-совместимая сводка: статистика по стадиям и значения счетчиков"""
+        counters: Dict[str, Any] = {}
+        for (counter_name, labels), value in sorted(self.counters.items()):
+            if labels:
+                label = ",".join(f"{key}={label_value}" for key, label_value in labels)
+                counters.setdefault(counter_name, {})[label] = value
+            else:
+                counters[counter_name] = value
+        return {
+            'stages': {stage: histogram.to_dict() for stage, histogram in sorted(self.histograms.items())},
+            'counters': counters,
+        }
+
+    def dump_summary(self, path: Optional[str] = None) -> Dict[str, Any]:
+        """Возвращает сводку и, если указан path, сохраняет ее в JSON файл"""
+        summary = self.summary()
+        if path:
+            jsonlib.dump_file(summary, path)
+        return summary
@@ -1,7 +1,7 @@
 from pydantic import BaseModel, HttpUrl, Field
 from typing import List, Optional, Dict, Any
 from datetime import datetime
-from sqlalchemy import Boolean, Column, Integer, String, DateTime, ForeignKey, Table, Float
+from sqlalchemy import Boolean, Column, Integer, BigInteger, String, DateTime, ForeignKey, Table, Float
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
 
@@ -83,6 +83,47 @@ class ApiRequest(Base):
     user_id = Column(Integer, ForeignKey("users.id"))
     user = relationship("User", back_populates="api_requests")
 
+class Seller(Base):
+    __tablename__ = "sellers"
+
+    id = Column(String, primary_key=True)  # ID продавца Ozon
+    name = Column(String)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    # Отношения
+    products = relationship("TrackedProduct", back_populates="seller")
+
+class TrackedProduct(Base):
+    __tablename__ = "products"
+
+    sku_id = Column(String, primary_key=True)
+    name = Column(String)
+    category = Column(String)
+    # Отпечаток последней цены: изменение цены проверяется без чтения истории
+    last_price_hash = Column(BigInteger)
+    first_seen_at = Column(DateTime, default=datetime.utcnow)
+    price_changed_at = Column(DateTime, default=datetime.utcnow)
+
+    # Внешний ключ
+    seller_id = Column(String, ForeignKey("sellers.id"), index=True)
+    seller = relationship("Seller", back_populates="products")
+    price_observations = relationship("PriceObservation", back_populates="product")
+
+class PriceObservation(Base):
+    __tablename__ = "price_observations"
+
+    id = Column(Integer, primary_key=True, index=True)
+    original = Column(Float)
+    discount = Column(Float)
+    discount_percent = Column(Integer)
+    final = Column(Float)
+    card_price = Column(Float)
+    observed_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+    # Внешний ключ
+    sku_id = Column(String, ForeignKey("products.sku_id"), index=True)
+    product = relationship("TrackedProduct", back_populates="price_observations")
+
 class Characteristic(BaseModel):
     name: str
     value: str
@@ -101,6 +142,13 @@ class ProductDetails(BaseModel):
     rating: float = 0.0
     reviews_count: int = 0
     quantity: int = 0
+    is_available: Optional[bool] = None
     sku_id: Optional[str] = None
     parsed_at: datetime
-    url: str 
\ No newline at end of file
+    url: str
+
+class ProductFetchResult(BaseModel):
+    """Результат загрузки одного товара в пакетном режиме"""
+    product_id: str
+    product: Optional[ProductDetails] = None
+    error: Optional[str] = None
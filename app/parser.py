@@ -1,18 +1,32 @@
 import httpx
 import json
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Iterable, AsyncIterator, Union, Callable, Awaitable, Tuple, TYPE_CHECKING
 import asyncio
+from collections import deque
+from contextlib import aclosing
+from dataclasses import dataclass, field
 from datetime import datetime
-from models import Product, Price, Pagination, PageResult, ProductDetails, Characteristic
+from models import PageResult, ProductDetails, ProductFetchResult
+from ratelimit import RateLimiter, RETRY_STATUSES
+from archive import ResponseArchiver
+import jsonlib
+from records import PageRecord, product_to_dict, page_to_dict
+from sinks import NdjsonSink, ColumnarSink, PRODUCT_DETAILS_COLUMNS, read_ndjson
+from checkpoint import CrawlCheckpoint
+from cache import ResponseCache
+from metrics import Metrics
+from dedupe import SkuSet, BloomFilter
+from extractor import PRODUCT_PROFILES, FetchError, ResponseExtractor
 from pydantic import HttpUrl
 import re
 from urllib.parse import urlparse, parse_qs
 from pathlib import Path
-import time
-import html
 import logging
 import os
 
+if TYPE_CHECKING:
+    from extraction import ExtractionPool
+
 # Constants
 HEADERS = {
     'accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7',
@@ -47,11 +61,71 @@ COOKIES = {
     '__Secure-ETC': '9ba3482ba26027dfe6ee4f74183396e6'
 }
 
+API_URL = "https://www.ozon.ru/api/entrypoint-api.bx/page/json/v2"
+
+# Варианты разметки списка товаров продавца для probe_page_layout:
+# постраничный контейнер (по умолчанию) и полная страница списка
+PAGE_LAYOUTS = (
+    {"layout_container": "categorySearchMegapagination"},
+    {},
+)
+
+# Форматы сохранения результатов и расширения файлов; parquet и arrow требуют pyarrow
+OUTPUT_FORMATS = {"json": ".json", "parquet": ".parquet", "arrow": ".arrow"}
+
+# Сколько страниц подряд без новых SKU допускается до остановки обхода продавца
+STALE_PAGES_LIMIT = 3
+
+
 # Настройка логгера
 logger = logging.getLogger(__name__)
 # Меняем уровень логирования на WARNING чтобы убрать избыточные сообщения
 logging.basicConfig(level=logging.WARNING)
 
+def _has_h2() -> bool:
+    """Проверяет, установлен ли пакет h2 (нужен httpx для HTTP/2)"""
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+_WORKER_DONE = object()
+
+
+async def map_unordered(func: Callable[[Any], Awaitable[Any]], items: Iterable[Any],
+                        concurrency: int) -> AsyncIterator[Tuple[Any, Any]]:
+    """Выполняет func для каждого элемента, не более concurrency одновременно.
+
+    Отдает пары (элемент, результат) по мере готовности; исключение func
+    возвращается вместо результата. Элементы берутся из итератора лениво,
+    поэтому число задач и размер очереди не зависят от длины items.
+    """
+    iterator = iter(items)
+    queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, concurrency))
+
+    async def worker() -> None:
+        for item in iterator:
+            try:
+                result = await func(item)
+            except Exception as e:
+                result = e
+            await queue.put((item, result))
+        await queue.put(_WORKER_DONE)
+
+    workers = [asyncio.create_task(worker()) for _ in range(max(1, concurrency))]
+    try:
+        remaining = len(workers)
+        while remaining:
+            entry = await queue.get()
+            if entry is _WORKER_DONE:
+                remaining -= 1
+                continue
+            yield entry
+    finally:
+        for task in workers:
+            task.cancel()
+
 def load_settings(settings_file: str = "settings.json") -> dict:
     """Загружает настройки из JSON файла"""
     try:
@@ -61,14 +135,59 @@ def load_settings(settings_file: str = "settings.json") -> dict:
         print(f"Ошибка загрузки настроек: {e}")
         return {}
 
-class OzonParser:
-    def __init__(self, seller_id: str = "520524"):
-        self.seller_id = seller_id
-        self.session = httpx.Client(
-            headers=HEADERS,
-            cookies=COOKIES,
-            follow_redirects=True
-        )
+@dataclass
+class _SellerCrawl:
+    """Состояние обхода одного продавца в crawl_sellers"""
+    pending: deque = field(default_factory=lambda: deque([1]))
+    in_flight: int = 0
+    total_pages: Optional[int] = None
+    loaded_pages: int = 0
+    failed_pages: List[int] = field(default_factory=list)
+    total_items: int = 0
+
+
+class OzonParser(ResponseExtractor):
+    def __init__(
+        self,
+        seller_id: Optional[str] = None,
+        api_url: str = API_URL,
+        max_connections: int = 20,
+        max_keepalive_connections: int = 10,
+        keepalive_expiry: float = 30.0,
+        http2: bool = True,
+        timeout: float = 30.0,
+        requests_per_second: Optional[float] = 1.0,
+        rate_limiter: Optional[RateLimiter] = None,
+        max_retries: int = 3,
+        archive: Union[bool, ResponseArchiver] = True,
+        compact: bool = False,
+        cache: Optional[ResponseCache] = None,
+        metrics: Optional[Metrics] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        extraction_pool: Optional["ExtractionPool"] = None,
+        probe_layout: bool = True,
+    ):
+        super().__init__(compact=compact, metrics=metrics, seller_id=seller_id)
+        self.api_url = api_url
+        # Общий ограничитель для всех запросов парсера (requests_per_second=None - без ограничения темпа)
+        self.rate_limiter = rate_limiter or RateLimiter(rate=requests_per_second)
+        self.max_retries = max_retries
+        # Кэш ответов (None - каждый вызов идет на сервер)
+        self.cache = cache
+        # Пул процессов для разбора ответов (extraction.py); None - разбор в цикле событий
+        self.extraction_pool = extraction_pool
+        # Параметры разметки списка продавца; с probe_layout подбираются probe_page_layout
+        # при первом обходе продавца и дальше используются для всех продавцов
+        self.page_layout: Dict[str, Any] = dict(PAGE_LAYOUTS[0])
+        self.probe_layout = probe_layout
+        self._layout_probed = False
+        # Архив сырых ответов: True - архив по умолчанию в api_responses/, False - не сохранять
+        # Переданные снаружи архив и кэш могут быть общими для нескольких парсеров: их закрывает владелец
+        self._owns_archiver = not isinstance(archive, ResponseArchiver)
+        if isinstance(archive, ResponseArchiver):
+            self.archiver = archive
+        else:
+            self.archiver = ResponseArchiver() if archive else None
         self.logger = logging.getLogger(__name__)
         # Устанавливаем уровень логирования для логгера класса
         self.logger.setLevel(logging.WARNING)
@@ -101,7 +220,34 @@ class OzonParser:
             self.headers.update(self.settings['headers'])
         # Получаем куки из настроек
         self.cookies = self.settings.get('cookies', {})
-        
+        # Один долгоживущий клиент на парсер: соединения переиспользуются между запросами.
+        # transport позволяет подменить сеть, например ReplayTransport (replay.py) для работы офлайн
+        self.client = httpx.AsyncClient(
+            transport=transport,
+            cookies=self.cookies,
+            headers=self.headers,
+            follow_redirects=True,
+            timeout=timeout,
+            http2=http2 and _has_h2(),
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+                keepalive_expiry=keepalive_expiry
+            )
+        )
+
+    async def aclose(self) -> None:
+        """Закрывает HTTP клиент и освобождает пул соединений; переданные кэш и архив не закрываются"""
+        await self.client.aclose()
+        if self.archiver and self._owns_archiver:
+            await self.archiver.aclose()
+
+    async def __aenter__(self) -> "OzonParser":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.aclose()
+
     def _extract_seller_id(self, url: str) -> str:
         """Извлекает ID продавца из URL"""
         try:
@@ -139,412 +285,565 @@ class OzonParser:
             print(f"Ошибка при извлечении ID продавца: {e}")
             return ""
 
-    def _extract_pagination_info(self, data: dict) -> Pagination:
-        """Extract pagination information from API response."""
+    async def _send(self, url: str, params: Dict[str, Any],
+                    headers: Optional[Dict[str, str]] = None) -> httpx.Response:
+        """Отправляет GET запрос с учетом ограничителя темпа и повторами при 429/403/5xx"""
+        attempt = 0
+        while True:
+            await self.rate_limiter.acquire(url)
+            try:
+                with self.metrics.time("http"):
+                    response = await self.client.get(url, params=params, headers=headers)
+            except httpx.TransportError as e:
+                if attempt >= self.max_retries:
+                    raise  # в errors считает _request
+                self.metrics.inc("retries", status="transport")
+                delay = self.rate_limiter.on_throttled(url, attempt)
+                logger.warning(f"Сетевая ошибка {e!r}, повтор через {delay:.1f} с")
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt >= self.max_retries:
+                    if response.status_code < 400:
+                        self.rate_limiter.on_success(url)
+                    return response
+                self.metrics.inc("retries", status=response.status_code)
+                delay = self.rate_limiter.on_throttled(url, attempt, response.headers.get("Retry-After"))
+                logger.warning(f"Статус {response.status_code}, повтор через {delay:.1f} с")
+            attempt += 1
+
+    def _archive(self, kind: str, content: bytes, extension: str = "json") -> None:
+        """Передает сырой ответ в фоновый архив, если он включен"""
+        if self.archiver:
+            self.archiver.submit(kind, content, extension)
+
+    async def _make_request(self, url: str, params: Dict[str, Any],
+                            raw: bool = False) -> Optional[Union[Dict[str, Any], bytes]]:
+        """Выполняет запрос к API, при ошибке возвращает None (причина пишется в лог).
+
+        При raw=True возвращает тело JSON ответа без разбора (разбор выполняется
+        в пуле извлечения), иначе - разобранный JSON.
+        """
         try:
-            # Получаем shared данные
-            shared_str = data.get('shared', '{}')
-            shared_data = json.loads(shared_str)
-            
-            # Извлекаем информацию о пагинации из catalog
-            catalog = shared_data.get('catalog', {})
-            total_found = catalog.get('totalFound', 0)
-            total_pages = catalog.get('totalPages', 0)
-            
-            return Pagination(
-                current_page=1,  # По умолчанию 1, так как не предоставляется в ответе
-                total_pages=total_pages,
-                items_per_page=12,  # Стандартное количество товаров на странице
-                total_items=total_found
-            )
-        except Exception as e:
-            print(f"Ошибка извлечения пагинации: {e}")
+            return await self._request(url, params, raw)
+        except FetchError as e:
+            logger.error(str(e))
             return None
 
-    def _extract_categories(self, data: Dict[str, Any]) -> Dict[str, str]:
-        """Извлекает информацию о категориях из filtersDesktop виджета"""
-        categories = {}
+    async def _request(self, url: str, params: Dict[str, Any],
+                       raw: bool = False) -> Union[Dict[str, Any], bytes]:
+        """То же, что _make_request, но при ошибке выбрасывает FetchError с причиной"""
         try:
-            # Ищем виджет с фильтрами
-            widget_states = data.get('widgetStates', {})
-            filters_widget_key = next((key for key in widget_states.keys() 
-                                    if 'filtersDesktop' in key), None)
-            
-            if not filters_widget_key:
-                print("filtersDesktop widget not found")
-                return {}
+            # Проверяем кэш: свежая запись отдается без запроса, устаревшая перепроверяется
+            cache_key, cached, headers = None, None, None
+            if self.cache:
+                cache_key = self.cache.make_key(url, params)
+                cached = await self.cache.aget(cache_key)
+                if cached and self.cache.is_fresh(cached, params):
+                    self.cache.hits += 1
+                    return cached.body if raw else self._decode(cached.body)
+                if cached:
+                    headers = self.cache.conditional_headers(cached) or None
             
-            # Парсим данные виджета
-            filters_data = json.loads(widget_states[filters_widget_key])
+            response = await self._send(url, params, headers)
             
-            # Ищем секцию с фильтром категорий
-            for section in filters_data.get('sections', []):
-                for filter_data in section.get('filters', []):
-                    if filter_data.get('type') == 'categoryFilter':
-                        category_filter = filter_data.get('categoryFilter', {})
-                        # Извлекаем категории
-                        for category in category_filter.get('categories', []):
-                            title = category.get('title', '')
-                            url_value = category.get('urlValue', '')
-                            level = category.get('level', 0)
-                            
-                            # Берем только категории нулевого уровня (основные)
-                            if level == 0 and title:
-                                categories[title] = {
-                                    'url': url_value,
-                                    'level': level
-                                }
-                        break  # Прерываем поиск после нахождения фильтра категорий
+            if response.status_code == 304 and cached:
+                self.cache.revalidated += 1
+                await self.cache.arefresh(cache_key, cached)
+                return cached.body if raw else self._decode(cached.body)
             
-            if not categories:
-                print("No categories found in filters")
-                # Создаем дефолтную категорию
-                categories["Все товары"] = {
-                    'url': 'default',
-                    'level': 0
-                }
+            if self.cache:
+                self.cache.misses += 1
+            self.metrics.inc("bytes_received", len(response.content))
             
-            return categories
-        
-        except Exception as e:
-            print(f"Ошибка извлечения категорий: {e}")
-            import traceback
-            traceback.print_exc()
-            return {"Все товары": {'url': 'default', 'level': 0}}
+            if response.status_code != 200:
+                # Сохраняем ответ с ошибкой
+                self.metrics.inc("errors", kind=f"http_{response.status_code}")
+                self._archive(f"error_{response.status_code}", response.content, "txt")
+                raise FetchError(f"http_{response.status_code}", f"Сервер вернул статус {response.status_code}")
 
-    def _extract_price_info(self, price_data: dict) -> Price:
-        """Extract price information from product data."""
-        try:
-            if not price_data:
-                return Price(original=0, final=None, card_price=0)
-
-            # Получаем цены из priceV2
-            prices = price_data.get('price', [])
-            if not prices:
-                return Price(original=0, final=None, card_price=0)
-
-            # Функция для очистки цены
-            def clean_price(price_text: str) -> float:
-                return float(re.sub(r'[^\d.]', '', price_text.replace(',', '.')))
-
-            # Получаем цену по карте (бывшая финальная цена)
-            card_price = clean_price(prices[0]['text']) if prices else 0
-
-            # Получаем оригинальную цену
-            original_price = clean_price(prices[1]['text']) if len(prices) > 1 else card_price
-
-            # Вычисляем скидку
-            discount = original_price - card_price if original_price > card_price else None
-            # Вычисляем процент скидки
-            discount_percent = int(round((discount / original_price) * 100)) if discount is not None and original_price > 0 else None
-
-            return Price(
-                original=original_price,
-                final=None,
-                card_price=card_price,
-                discount=discount,
-                discount_percent=discount_percent
-            )
-        except Exception as e:
-            print(f"Ошибка извлечения цен: {e}")
-            return Price(original=0, final=None, card_price=0)
+            if not ("application/json" in response.headers.get("Content-Type", "") or response.content.lstrip()[:1] == b'{'):
+                # Сохраняем HTML ответ
+                self.metrics.inc("errors", kind="html")
+                self._archive("html_response", response.content, "html")
+                raise FetchError("html", "Сервер вернул HTML вместо JSON")
 
-    def _extract_product_info(self, item: dict) -> Product:
-        """Extract product information from widget."""
-        name = item.get('title', '')
-        category = None
-        
-        # Try to get category from labelList
-        label_list = item.get('labelList', [])
-        if label_list:
-            for label in label_list:
-                if 'text' in label and 'category' in label.get('textColor', '').lower():
-                    category = label['text']
-                    break
-        
-        # If category not found in labelList, try to find in actions
-        if not category and 'action' in item:
-            action = item.get('action', {})
-            if isinstance(action, dict) and 'link' in action:
-                link = action['link']
-                # Look for category in URL
-                if '/category/' in link:
-                    category_parts = link.split('/category/')
-                    if len(category_parts) > 1:
-                        category = category_parts[1].split('/')[0].replace('-', ' ').title()
-
-        # Extract price info
-        price_info = self._extract_price_info(item)
-        
-        # Create Price object
-        price = Price(
-            original=price_info.original,
-            discount=price_info.discount,
-            final=price_info.final,
-            card_price=price_info.card_price,
-            discount_percent=price_info.discount_percent
-        )
-        
-        return Product(
-            name=name,
-            category=category,
-            price=price,
-            seller_id=self.seller_id,
-            quantity=item.get('quantity', 0),
-            rating=item.get('rating', 0),
-            reviews=item.get('reviewCount', 0),
-            images=item.get('images', [])
-        )
-
-    def _extract_products(self, data: Dict[str, Any], seller_id: str) -> List[Product]:
-        """Извлекает список товаров из ответа API"""
-        products = []
-        try:
-            # Получаем категории
-            categories = self._extract_categories(data)
-            
-            # Ищем виджет с результатами поиска
-            widget_states = data.get('widgetStates', {})
-            widget_key = next((key for key in widget_states.keys() 
-                            if 'searchResultsV2' in key), None)
-                            
-            if not widget_key:
-                logger.error("searchResultsV2 widget not found")
-                return []
-                
-            widget_data_raw = widget_states[widget_key]
-            
             try:
-                widget_data = json.loads(widget_data_raw)
-            except json.JSONDecodeError as e:
-                logger.error(f"Failed to parse widget data: {e}")
-                return []
-            
-            items = widget_data.get('items', [])
-            
-            # Обрабатываем каждый товар
-            for item in items:
-                try:
-                    # Получаем основные данные товара из mainState
-                    main_state = item.get('mainState', [])
-                    title = None
-                    price_data = None
-                    rating = None
-                    reviews = None
-                    
-                    for state in main_state:
-                        if state.get('type') == 'atom' and state.get('id') == 'name':
-                            title = state.get('atom', {}).get('textAtom', {}).get('text', '')
-                        elif state.get('type') == 'atom' and state.get('id') == 'atom':
-                            price_data = state.get('atom', {}).get('priceV2', {})
-                        elif state.get('atom', {}).get('type') == 'labelList':
-                            label_list = state.get('atom', {}).get('labelList', {}).get('items', [])
-                            for label in label_list:
-                                if label.get('icon', {}).get('image') == 'ic_s_star_filled_compact':
-                                    rating = float(label.get('title', '0').strip())
-                                elif label.get('icon', {}).get('image') == 'ic_s_dialog_filled_compact':
-                                    reviews_text = label.get('title', '0')
-                                    reviews = int(''.join(filter(str.isdigit, reviews_text)))
-                    
-                    # Получаем категорию из action и сопоставляем с извлеченными категориями
-                    action = item.get('action', {})
-                    category = None
-                    if isinstance(action, dict) and 'link' in action:
-                        link = action['link']
-                        # Ищем соответствующую категорию по URL
-                        for cat_name, cat_data in categories.items():
-                            if cat_data['url'] in link:
-                                category = cat_name
-                                break
-                    
-                    # Если категория не найдена, используем "Все товары"
-                    if not category:
-                        category = "Все товары"
-                    
-                    # Получаем количество товара из multiButton
-                    multi_button = item.get('multiButton', {})
-                    ozon_button = multi_button.get('ozonButton', {})
-                    button_data = ozon_button.get('addToCartButtonWithQuantity', {})
-                    quantity = button_data.get('maxItems', 0)
-                    
-                    # Получаем изображения
-                    tile_image = item.get('tileImage', {})
-                    images = [img.get('image', {}).get('link') for img in tile_image.get('items', [])]
-                    
-                    # Получаем цены
-                    price = self._extract_price_info(price_data)
-                    
-                    # Получаем skuId
-                    sku_id = item.get('skuId', '')
-                    
-                    # Создаем объект Product
-                    if title:  # Создаем продукт только если есть название
-                        product = Product(
-                            name=html.unescape(title),
-                            category=category,
-                            price=price,
-                            seller_id=seller_id,
-                            quantity=quantity,
-                            rating=rating or 0.0,
-                            reviews=reviews or 0,
-                            images=images,
-                            sku_id=sku_id
-                        )
-                        products.append(product)
-                except Exception as e:
-                    logger.error(f"Error processing item: {e}")
-                    continue
-                    
-        except Exception as e:
-            logger.error(f"Ошибка извлечения списка товаров: {e}")
-            import traceback
-            logger.error(traceback.format_exc())
-        
-        return products
+                json_data = response.content if raw else self._decode(response.content)
+            except jsonlib.DECODE_ERRORS as e:
+                self.metrics.inc("errors", kind="json")
+                # Сохраняем сырой ответ
+                self._archive("raw_response", response.content, "txt")
+                raise FetchError("json", f"Ошибка при разборе JSON: {e}") from e
 
-    async def _make_request(self, url: str, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        """Выполняет запрос к API"""
-        try:
-            # Создаем директорию для сохранения ответов
-            api_responses_dir = Path("api_responses")
-            api_responses_dir.mkdir(exist_ok=True)
-            timestamp = time.strftime("%Y%m%d_%H%M%S")
-            
-            # Используем синхронный клиент для лучшей совместимости
-            with httpx.Client(
-                cookies=self.cookies,
-                headers=self.headers,
-                follow_redirects=True,
-                timeout=30.0
-            ) as client:
-                response = client.get(url, params=params)
-                
-                if response.status_code == 200:
-                    if "application/json" in response.headers.get("Content-Type", "") or response.text.strip().startswith('{'):
-                        try:
-                            json_data = response.json()
-                            
-                            # Сохраняем JSON ответ
-                            json_file = api_responses_dir / f"response_{timestamp}.json"
-                            with open(json_file, "w", encoding="utf-8") as f:
-                                json.dump(json_data, f, ensure_ascii=False, indent=2)
-                            
-                            return json_data
-                            
-                        except json.JSONDecodeError as e:
-                            logger.error(f"Ошибка при разборе JSON: {e}")
-                            # Сохраняем сырой ответ
-                            raw_file = api_responses_dir / f"raw_response_{timestamp}.txt"
-                            with open(raw_file, "w", encoding="utf-8") as f:
-                                f.write(response.text)
-                    else:
-                        # Сохраняем HTML ответ
-                        html_file = api_responses_dir / f"html_response_{timestamp}.html"
-                        with open(html_file, "w", encoding="utf-8") as f:
-                            f.write(response.text)
-                else:
-                    # Сохраняем ответ с ошибкой
-                    error_file = api_responses_dir / f"error_{status_code}_{timestamp}.txt"
-                    with open(error_file, "w", encoding="utf-8") as f:
-                        f.write(response.text)
-                
-                return None
-                
+            # Сохраняем JSON ответ
+            self._archive("response", response.content)
+            if self.cache:
+                await self.cache.astore(cache_key, response.content, response.headers)
+            return json_data
+
+        except FetchError:
+            raise
+        except httpx.TransportError as e:
+            self.metrics.inc("errors", kind="transport")
+            raise FetchError("transport", f"Сетевая ошибка: {e!r}") from e
         except Exception as e:
-            logger.error(f"Ошибка запроса: {e}")
-            return None
+            self.metrics.inc("errors", kind="request")
+            raise FetchError("request", f"Ошибка запроса: {e!r}") from e
 
-    async def get_page(self, url_or_seller_id: str, page: int = 1) -> Optional[PageResult]:
-        """Получает данные одной страницы"""
+    def _resolve_seller_id(self, url_or_seller_id: str) -> str:
+        """Возвращает ID продавца из ID или ссылки на магазин"""
         # Проверяем, является ли входной параметр ID продавца
         if url_or_seller_id.isdigit():
-            seller_id = url_or_seller_id
-        else:
-            seller_id = self._extract_seller_id(url_or_seller_id)
+            return url_or_seller_id
+        return self._extract_seller_id(url_or_seller_id)
+
+    def _page_params(self, seller_id: str, page: int, layout: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        params = {"url": f"/seller/magazin-{seller_id}/products/"}
+        layout = self.page_layout if layout is None else layout
+        params.update(layout)
+        if "layout_container" in layout:
+            params["layout_page_index"] = page
+        params["page"] = page
+        return params
+
+    async def probe_page_layout(self, url_or_seller_id: str,
+                                layouts: Iterable[Dict[str, Any]] = PAGE_LAYOUTS) -> Dict[str, Any]:
+        """Выбирает из layouts вариант с наибольшим размером страницы.
+
+        Запрашивает первую страницу продавца в каждом варианте; выбранный вариант
+        сохраняется в page_layout и используется get_page для всех продавцов.
+        """
+        layout, _ = await self._probe_first_page(url_or_seller_id, layouts)
+        return layout
+
+    async def _probe_first_page(self, url_or_seller_id: str, layouts: Iterable[Dict[str, Any]] = PAGE_LAYOUTS
+                                ) -> Tuple[Dict[str, Any], Optional[Union[PageResult, PageRecord]]]:
+        """Подбирает разметку и возвращает ее вместе с первой страницей в этой разметке"""
+        best, best_result, best_items = self.page_layout, None, 0
+        for layout in layouts:
+            result = await self.get_page(url_or_seller_id, page=1, layout=layout)
+            items = result.pagination.items_per_page if result else 0
+            self.logger.info(f"Вариант {layout or 'полная страница'}: товаров на странице {items}")
+            if result and (best_result is None or items > best_items):
+                best, best_result, best_items = layout, result, items
+        self.page_layout = dict(best)
+        self._layout_probed = True
+        return self.page_layout, best_result
+
+    async def _first_page(self, url_or_seller_id: str, layout: Optional[Dict[str, Any]] = None
+                          ) -> Optional[Union[PageResult, PageRecord]]:
+        """Первая страница обхода; при первом обходе с probe_layout заодно подбирается разметка"""
+        if layout is None and self.probe_layout and not self._layout_probed:
+            _, result = await self._probe_first_page(url_or_seller_id)
+            return result
+        return await self.get_page(url_or_seller_id, page=1, layout=layout)
+
+    async def get_page(self, url_or_seller_id: str, page: int = 1, layout: Optional[Dict[str, Any]] = None,
+                       next_url: Optional[str] = None) -> Optional[Union[PageResult, PageRecord]]:
+        """Получает данные одной страницы.
+
+        layout - параметры разметки списка (по умолчанию page_layout), next_url -
+        адрес страницы из metadata["next_page"] предыдущей страницы.
+        """
+        seller_id = self._resolve_seller_id(url_or_seller_id)
             
         if not seller_id:
             print("Не удалось получить ID продавца")
             return None
 
         # Используем прямой формат API URL
-        api_url = "https://www.ozon.ru/api/entrypoint-api.bx/page/json/v2"
-        params = {
-            "url": f"/seller/magazin-{seller_id}/products/",
-            "layout_container": "categorySearchMegapagination",
-            "layout_page_index": page,
-            "page": page
-        }
+        api_url = self.api_url
+        params = {"url": next_url} if next_url else self._page_params(seller_id, page, layout)
+
+        if self.extraction_pool:
+            # Разбор и извлечение выполняются в пуле процессов, цикл событий занят только сетью
+            body = await self._make_request(api_url, params, raw=True)
+            if not body:
+                return None
+            # Счетчики воркера (widget_decodes, products_extracted) добавляются в self.metrics
+            with self.metrics.time("extract_products"):
+                return await self.extraction_pool.extract_page(body, seller_id, page, self.metrics, self.compact)
 
         data = await self._make_request(api_url, params)
         if not data:
             return None
+        return self._build_page(data, seller_id, page)
 
-        # Извлекаем информацию о пагинации
-        pagination = self._extract_pagination_info(data)
-        if not pagination:
-            return None
-
-        # Извлекаем список товаров
-        products = self._extract_products(data, seller_id)
-
-        return PageResult(
-            pagination=pagination,
-            products=products,
-            metadata={
-                "seller_id": seller_id,
-                "parsed_at": datetime.now().isoformat(),
-                "url": f"https://www.ozon.ru/seller/magazin-{seller_id}/products/"
-            }
-        )
-
-    def save_page_result(self, result: PageResult, output_dir: str = "results") -> str:
-        """Сохраняет результаты парсинга страницы в JSON файл"""
+    def save_page_result(self, result: PageResult, output_dir: str = "results",
+                         output_format: str = "json") -> str:
+        """Сохраняет результаты парсинга страницы в JSON файл (или Parquet/Arrow, см. OUTPUT_FORMATS)"""
         try:
             # Создаем директорию если её нет
             os.makedirs(output_dir, exist_ok=True)
             
             # Формируем имя файла
-            filename = f"{output_dir}/seller_{result.metadata['seller_id']}_page_{result.pagination.current_page}.json"
+            filename = f"{output_dir}/seller_{result.metadata['seller_id']}_page_{result.pagination.current_page}"
+            if output_format != "json":
+                filename += OUTPUT_FORMATS[output_format]
+                with self.metrics.time("save"), ColumnarSink(filename, output_format) as sink:
+                    sink.write_page(result)
+                return filename
+            filename += ".json"
             
             # Преобразуем результат в словарь
-            result_dict = result.model_dump(exclude_none=False)  # Включаем None значения
+            result_dict = page_to_dict(result)  # Включаем None значения
             
             # Сохраняем результат
-            with open(filename, 'w', encoding='utf-8') as f:
-                json.dump(result_dict, f, ensure_ascii=False, indent=2, default=str)
+            with self.metrics.time("save"):
+                jsonlib.dump_file(result_dict, filename)
             
             return filename
         except Exception as e:
             print(f"Ошибка сохранения результатов: {e}")
             return ""
 
-    async def get_all_pages(self, url_or_seller_id: str) -> List[PageResult]:
-        """Получает все страницы с товарами продавца"""
-        # Получаем первую страницу для определения общего количества страниц
-        first_page = await self.get_page(url_or_seller_id, page=1)
-        if not first_page:
-            return []
+    def save_product(self, product: ProductDetails, output_dir: str = "results",
+                     output_format: str = "json") -> str:
+        """Сохраняет товар в JSON файл (или Parquet/Arrow одной строкой)"""
+        os.makedirs(output_dir, exist_ok=True)
+        filename = f"{output_dir}/product_{product.id}{OUTPUT_FORMATS[output_format]}"
+        with self.metrics.time("save"):
+            if output_format == "json":
+                jsonlib.dump_file(product.model_dump(), filename)
+            else:
+                with ColumnarSink(filename, output_format, columns=PRODUCT_DETAILS_COLUMNS) as sink:
+                    sink.write_product(product)
+        return filename
 
-        total_pages = first_page.pagination.total_pages
-        results = [first_page]
-        
-        # Получаем остальные страницы
-        for page in range(2, total_pages + 1):
-            print(f"\rЗагрузка страницы {page} из {total_pages}...", end="")
-            result = await self.get_page(url_or_seller_id, page=page)
+    async def iter_pages(self, url_or_seller_id: str, concurrency: int = 1,
+                         pages: Optional[Iterable[int]] = None,
+                         follow_next: bool = False,
+                         stop_after_stale: Optional[int] = STALE_PAGES_LIMIT,
+                         seen: Optional[Union[SkuSet, BloomFilter]] = None,
+                         stats: Optional[Dict[str, Any]] = None,
+                         layout: Optional[Dict[str, Any]] = None) -> AsyncIterator[Tuple[int, Optional[PageResult]]]:
+        """Отдает страницы продавца в порядке загрузки парами (номер, результат или None при ошибке)"""
+        # stats заполняется итогами обхода: total_pages, duplicates, stopped_early, page_layout
+        seen = seen if seen is not None else SkuSet()
+        stats = stats if stats is not None else {}
+        stats.update(total_pages=None, duplicates=0, stopped_early=False, page_layout=layout)
+        stale = 0
+
+        def accept(result: Any) -> bool:
+            """Убирает повторные SKU и возвращает False, если обход пора прекратить"""
+            nonlocal stale
+            if not result:
+                return True
+            count = len(result.products)
+            result.products = [product for product in result.products if not product.sku_id or seen.add(product.sku_id)]
+            stats['duplicates'] += count - len(result.products)
+            if count:
+                # Пустые страницы не считаются: повторы видны только на страницах с карточками
+                stale = 0 if result.products else stale + 1
+            if result.pagination.total_pages:
+                stats['total_pages'] = result.pagination.total_pages
+            # После stop_after_stale страниц подряд без новых SKU обход прекращается (None - не прекращать)
+            if stop_after_stale and stale >= stop_after_stale:
+                logger.info(f"{stale} страниц подряд без новых товаров, обход остановлен")
+                stats['stopped_early'] = True
+                return False
+            return True
+
+        if follow_next and pages is None:
+            # Страницы загружаются последовательно по адресу следующей страницы из ответа, пока он есть
+            page, next_url = 1, None
+            while True:
+                if next_url:
+                    result = await self.get_page(url_or_seller_id, page=page, next_url=next_url)
+                else:
+                    result = await self._first_page(url_or_seller_id, layout)
+                keep_going = accept(result)
+                yield page, result
+                next_url = result.metadata.get("next_page") if result else None
+                if not next_url or not keep_going:
+                    return
+                page += 1
+
+        if pages is None:
+            # Число страниц известно по первой странице, остальные загружаются параллельно
+            first_page = await self._first_page(url_or_seller_id, layout)
+            keep_going = accept(first_page)
+            stats['page_layout'] = layout = self.page_layout if layout is None else layout
+            yield 1, first_page
+            if not first_page or not keep_going:
+                return
+
+            def remaining_pages() -> Iterable[int]:
+                # Граница берется заново перед каждой страницей: каталог мог сократиться или вырасти
+                page = 2
+                while page <= (stats['total_pages'] or 0):
+                    yield page
+                    page += 1
+
+            pages = remaining_pages()
+        else:
+            if layout is None and self.probe_layout and not self._layout_probed:
+                # Первая страница пробы не запрашивается повторно
+                _, first_page = await self._probe_first_page(url_or_seller_id)
+                pages = list(pages)
+                if 1 in pages:
+                    pages.remove(1)
+                    keep_going = accept(first_page)
+                    stats['page_layout'] = self.page_layout
+                    yield 1, first_page
+                    if not keep_going:
+                        return
+                elif first_page:
+                    stats['total_pages'] = first_page.pagination.total_pages
+            stats['page_layout'] = layout = self.page_layout if layout is None else layout
+            explicit_pages = pages
+            pages = (page for page in explicit_pages if not stats['total_pages'] or page <= stats['total_pages'])
+
+        async with aclosing(map_unordered(
+            lambda page: self.get_page(url_or_seller_id, page=page, layout=layout), pages, concurrency
+        )) as results:
+            async for page, result in results:
+                if isinstance(result, Exception):
+                    # Ошибка одной страницы не должна прерывать загрузку остальных
+                    logger.error(f"Ошибка загрузки страницы {page}: {result}")
+                    result = None
+                keep_going = accept(result)
+                yield page, result
+                if not keep_going:
+                    return
+
+    async def get_all_pages(self, url_or_seller_id: str, concurrency: int = 1,
+                            follow_next: bool = False,
+                            stop_after_stale: Optional[int] = STALE_PAGES_LIMIT) -> List[PageResult]:
+        """Получает все страницы с товарами продавца (повторные SKU отбрасываются)"""
+        # Темп запросов задает rate_limiter, а не фиксированная пауза
+        loaded = {}
+        async for page, result in self.iter_pages(url_or_seller_id, concurrency, follow_next=follow_next,
+                                                  stop_after_stale=stop_after_stale):
             if result:
-                results.append(result)
-            # Добавляем небольшую задержку между запросами
-            await asyncio.sleep(1)
+                loaded[page] = result
+                print(f"\rЗагружено страниц: {len(loaded)}...", end="")
+            else:
+                logger.warning(f"Страница {page} не загружена")
+        
+        if 1 not in loaded:
+            return []
         
         print("\nЗагрузка завершена!")
-        return results
+        return [loaded[page] for page in sorted(loaded)]
 
-    def save_all_results(self, results: List[PageResult], output_dir: str = "results") -> str:
-        """Сохраняет результаты парсинга всех страниц в один JSON файл"""
+    async def crawl_to_ndjson(self, url_or_seller_id: str, path: str, concurrency: int = 1,
+                              compression: Optional[str] = None, resume: bool = True,
+                              checkpoint_path: Optional[str] = None,
+                              stop_after_stale: Optional[int] = STALE_PAGES_LIMIT) -> Dict[str, Any]:
+        """Загружает страницы продавца в NDJSON по мере поступления, с продолжением после сбоя (resume)"""
+        # Прогресс хранится в контрольной точке (по умолчанию <path>.checkpoint.json) и удаляется после
+        # полной загрузки. loaded_pages и total_items в итогах считаются по всему файлу, new_items - за этот запуск
+        seller_id = self._resolve_seller_id(url_or_seller_id)
+        checkpoint = CrawlCheckpoint.load(checkpoint_path or f"{path}.checkpoint.json", seller_id)
+        resuming = resume and checkpoint.started and Path(path).exists()
+        pages, layout, seen = None, None, None
+        if resuming:
+            # Отбрасываем хвост страницы, запись которой прервалась после последней контрольной точки
+            with open(path, "r+b") as f:
+                f.truncate(checkpoint.output_size)
+            # Номера страниц имеют смысл только в разметке прошлого запуска: повторно она не подбирается
+            pages, layout = checkpoint.pending_pages(), checkpoint.page_layout
+            # SKU из уже записанных страниц, иначе их повторы на догружаемых страницах попадут в файл
+            seen = await asyncio.to_thread(self._read_seen, path, compression)
+            print(f"Продолжение загрузки: готово страниц {len(checkpoint.completed)}, осталось {len(pages)}")
+        else:
+            checkpoint = CrawlCheckpoint(checkpoint.path, seller_id)
+
+        new_items = 0
+        stats: Dict[str, Any] = {}
+        with NdjsonSink(path, compression=compression, append=resuming) as sink:
+            async for page, result in self.iter_pages(url_or_seller_id, concurrency, pages=pages,
+                                                      stop_after_stale=stop_after_stale, seen=seen,
+                                                      stats=stats, layout=layout):
+                if not result:
+                    logger.warning(f"Страница {page} не загружена")
+                    checkpoint.mark_failed(page)
+                    if checkpoint.started:
+                        checkpoint.save()
+                    continue
+                if not checkpoint.started:
+                    checkpoint.total_pages = result.pagination.total_pages
+                    checkpoint.page_layout = stats['page_layout']
+                with self.metrics.time("write"):
+                    page_items = sink.write_page(result)
+                new_items += page_items
+                checkpoint.mark_completed(page, sink.tell(), page_items)
+                checkpoint.save()
+                print(f"\rЗагружено страниц: {len(checkpoint.completed)}, товаров: {checkpoint.items_written}...", end="")
+        print("\nЗагрузка завершена!")
+
+        if checkpoint.started and stats['stopped_early']:
+            # Страницы после остановки (и прерванные ею) новых товаров не дают,
+            # при resume догружаются только неудачные страницы
+            checkpoint.total_pages = max(checkpoint.failed, default=0)
+        elif checkpoint.started and stats['total_pages'] and stats['total_pages'] < checkpoint.total_pages:
+            checkpoint.total_pages = stats['total_pages']
+
+        pending_pages = checkpoint.pending_pages() if checkpoint.started else [1]
+        if checkpoint.started and not pending_pages:
+            checkpoint.remove()
+        return {
+            "seller_id": seller_id,
+            "path": str(sink.path),
+            "resumed": resuming,
+            "loaded_pages": len(checkpoint.completed),
+            "failed_pages": pending_pages,
+            "total_items": checkpoint.items_written,
+            "new_items": new_items,
+            "duplicates": stats['duplicates'],
+            "stopped_early": stats['stopped_early']
+        }
+
+    @staticmethod
+    def _read_seen(path: str, compression: Optional[str] = None) -> SkuSet:
+        """SKU товаров, уже записанных в NDJSON файл"""
+        seen = SkuSet()
+        for row in read_ndjson(path, compression):
+            if row.get('sku_id'):
+                seen.add(row['sku_id'])
+        return seen
+
+    async def crawl_to_columnar(self, url_or_seller_id: str, path: str, concurrency: int = 1,
+                                output_format: Optional[str] = None,
+                                row_group_size: int = 50_000) -> Dict[str, Any]:
+        """Загружает все страницы продавца в Parquet/Arrow, записывая товары блоками по мере поступления страниц.
+
+        В отличие от crawl_to_ndjson контрольная точка не ведется: колоночный
+        файл нельзя дописать после сбоя.
+        """
+        seller_id = self._resolve_seller_id(url_or_seller_id)
+        failed_pages = []
+        with ColumnarSink(path, output_format, row_group_size=row_group_size) as sink:
+            async for page, result in self.iter_pages(url_or_seller_id, concurrency):
+                if not result:
+                    logger.warning(f"Страница {page} не загружена")
+                    failed_pages.append(page)
+                    continue
+                with self.metrics.time("write"):
+                    sink.write_page(result)
+                print(f"\rЗагружено товаров: {sink.items_written}...", end="")
+        print("\nЗагрузка завершена!")
+        return {
+            "seller_id": seller_id,
+            "path": str(sink.path),
+            "failed_pages": sorted(failed_pages),
+            "total_items": sink.items_written
+        }
+
+    async def crawl_sellers(self, seller_ids: Iterable[str], sink: Any, concurrency: int = 8,
+                            per_seller_concurrency: int = 2) -> Dict[str, Any]:
+        """Обходит страницы списка продавцов по кругу и передает их в sink (объект с write_page) по мере загрузки"""
+        sellers: Dict[str, _SellerCrawl] = {}
+        for seller in seller_ids:
+            seller_id = self._resolve_seller_id(str(seller))
+            if seller_id:
+                sellers.setdefault(seller_id, _SellerCrawl())
+            else:
+                logger.warning(f"Не удалось получить ID продавца: {seller}")
+        ring = deque(sellers)
+        running: Dict[asyncio.Task, Tuple[str, int]] = {}
+        writes: asyncio.Queue = asyncio.Queue(maxsize=concurrency)
+        write_errors: List[Exception] = []
+
+        async def writer() -> None:
+            # Одна задача записи: приемники не обязаны быть потокобезопасными
+            while (item := await writes.get()) is not None:
+                seller_id, result = item
+                if write_errors:
+                    continue  # после ошибки очередь только вычерпывается
+                try:
+                    with self.metrics.time("write"):
+                        if asyncio.iscoroutinefunction(sink.write_page):
+                            count = await sink.write_page(result)
+                        else:
+                            count = await asyncio.to_thread(sink.write_page, result)
+                    sellers[seller_id].total_items += count
+                except Exception as e:
+                    write_errors.append(e)
+
+        async def complete(seller_id: str, page: int, result: Any) -> None:
+            state = sellers[seller_id]
+            if not result:
+                state.failed_pages.append(page)
+                return
+            if page == 1:
+                state.total_pages = result.pagination.total_pages
+                state.pending.extend(range(2, state.total_pages + 1))
+            state.loaded_pages += 1
+            # Пишет задача writer (синхронный write_page - в потоке); очередь ограничена concurrency страницами
+            await writes.put((seller_id, result))
+
+        writer_task = asyncio.create_task(writer())
+
+        try:
+            if sellers and self.probe_layout and not self._layout_probed:
+                # Первая страница, загруженная при подборе разметки, идет в обход без повторного запроса
+                sellers[ring[0]].pending.popleft()
+                _, result = await self._probe_first_page(ring[0])
+                await complete(ring[0], 1, result)
+            while ring or running:
+                # Раздаем свободные слоты по кругу: не больше одной страницы продавца за проход
+                idle = 0
+                while len(running) < concurrency and ring and idle < len(ring):
+                    seller_id = ring.popleft()
+                    state = sellers[seller_id]
+                    if not state.pending and not state.in_flight:
+                        continue  # продавец обойден полностью
+                    ring.append(seller_id)
+                    if state.pending and state.in_flight < per_seller_concurrency:
+                        page = state.pending.popleft()
+                        state.in_flight += 1
+                        running[asyncio.create_task(self.get_page(seller_id, page=page))] = (seller_id, page)
+                        idle = 0
+                    else:
+                        idle += 1
+                if not running:
+                    break
+
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    seller_id, page = running.pop(task)
+                    state = sellers[seller_id]
+                    state.in_flight -= 1
+                    try:
+                        result = task.result()
+                    except Exception as e:
+                        logger.error(f"Ошибка загрузки страницы {page} продавца {seller_id}: {e}")
+                        result = None
+                    await complete(seller_id, page, result)
+                if write_errors:
+                    raise write_errors[0]
+            await writes.put(None)
+            await writer_task
+            if write_errors:
+                raise write_errors[0]
+        finally:
+            for task in running:
+                task.cancel()
+            writer_task.cancel()
+
+        return {
+            "sellers": len(sellers),
+            "loaded_pages": sum(state.loaded_pages for state in sellers.values()),
+            "total_items": sum(state.total_items for state in sellers.values()),
+            "failed_pages": {
+                seller_id: state.failed_pages for seller_id, state in sellers.items() if state.failed_pages
+            },
+        }
+
+    def save_all_results(self, results: List[PageResult], output_dir: str = "results",
+                         output_format: str = "json") -> str:
+        """Сохраняет результаты парсинга всех страниц в один JSON файл (или Parquet/Arrow)"""
         try:
             # Создаем директорию если её нет
             os.makedirs(output_dir, exist_ok=True)
+
+            if output_format != "json":
+                filename = f"{output_dir}/seller_{results[0].metadata['seller_id']}_all_products{OUTPUT_FORMATS[output_format]}"
+                with self.metrics.time("save"), ColumnarSink(filename, output_format) as sink:
+                    for result in results:
+                        sink.write_page(result)
+                return filename
             
             # Собираем все товары в один список
             all_products = []
@@ -552,7 +851,7 @@ class OzonParser:
             seller_id = None
             
             for result in results:
-                all_products.extend([product.model_dump() for product in result.products])
+                all_products.extend([product_to_dict(product) for product in result.products])
                 total_items += len(result.products)
                 if not seller_id:
                     seller_id = result.metadata['seller_id']
@@ -572,464 +871,170 @@ class OzonParser:
             filename = f"{output_dir}/seller_{seller_id}_all_products.json"
             
             # Сохраняем результат
-            with open(filename, 'w', encoding='utf-8') as f:
-                json.dump(final_result, f, ensure_ascii=False, indent=2, default=str)
+            with self.metrics.time("save"):
+                jsonlib.dump_file(final_result, filename)
             
             return filename
         except Exception as e:
             print(f"Ошибка сохранения результатов: {e}")
             return ""
 
-    def _extract_product_details(self, data: Dict[str, Any], product_id: str) -> Optional[ProductDetails]:
-        """Извлекает детальную информацию о продукте из ответа API"""
-        try:
-            # Получаем schema.org разметку
-            schema_data = None
-            seo_data = data.get('seo', {})
-            if isinstance(seo_data, str):
-                try:
-                    seo_data = json.loads(seo_data)
-                except json.JSONDecodeError:
-                    seo_data = {}
-            
-            for script in seo_data.get('script', []):
-                if script.get('type') == 'application/ld+json':
-                    try:
-                        schema_data = json.loads(script.get('innerHTML', '{}'))
-                        break
-                    except json.JSONDecodeError:
-                        continue
+    def _product_params(self, product_id: str, profile: str = "full") -> List[Dict[str, Any]]:
+        """Параметры основного запроса товара и, если профиль включает описание, запроса блока описания"""
+        requests = [{"url": f"/product/{product_id}"}]
+        if "description" in PRODUCT_PROFILES[profile]:
+            requests.append({
+                "url": f"/product/{product_id}",
+                "layout_container": "pdpPage2column",
+                "layout_page_index": 2
+            })
+        return requests
 
-            # Получаем виджеты
-            widget_states = data.get('widgetStates', {})
-            
-            # Ищем нужные виджеты по точным ключам
-            gallery_widget = None
-            price_widget = None
-            reviews_widget = None
-            seller_widget = None
-            breadcrumbs_widget = None
-            characteristics_widget = None
-            short_characteristics_widget = None
-            description_widget = None  # Добавляем переменную для виджета описания
-            
-            # Получаем виджет с ценой по точному ключу
-            price_widget_key = 'webPrice-3121879-default-1'
-            price_widget_data = widget_states.get(price_widget_key)
-            
-            if price_widget_data:
-                try:
-                    price_widget = json.loads(price_widget_data) if isinstance(price_widget_data, str) else price_widget_data
-                except (json.JSONDecodeError, TypeError) as e:
-                    self.logger.error(f"Ошибка парсинга виджета цены: {e}")
-                    price_widget = None
-
-            # Ищем остальные виджеты
-            for key, value in widget_states.items():
-                try:
-                    if 'webGallery' in key:
-                        gallery_widget = json.loads(value) if isinstance(value, str) else value
-                    elif 'webReviewProductScore' in key:
-                        reviews_widget = json.loads(value) if isinstance(value, str) else value
-                    elif 'webStickyProducts' in key:
-                        seller_widget = json.loads(value) if isinstance(value, str) else value
-                    elif 'breadCrumbs' in key:
-                        breadcrumbs_widget = json.loads(value) if isinstance(value, str) else value
-                    elif 'webCharacteristics' in key:
-                        characteristics_widget = json.loads(value) if isinstance(value, str) else value
-                    elif 'webShortCharacteristics' in key:
-                        short_characteristics_widget = json.loads(value) if isinstance(value, str) else value
-                    elif 'webDescription' in key:
-                        description_widget = json.loads(value) if isinstance(value, str) else value
-                except (json.JSONDecodeError, TypeError) as e:
-                    self.logger.error(f"Ошибка парсинга виджета {key}: {e}")
-                    continue
+    async def _fetch_product_bodies(self, product_id: str, profile: str = "full",
+                                    raw: bool = False) -> Tuple[Any, Any]:
+        """Загружает основной ответ товара и блок описания параллельно.
 
-            # Получаем базовую информацию из layoutTrackingInfo
-            try:
-                layout_info = json.loads(data.get('layoutTrackingInfo', '{}')) if isinstance(data.get('layoutTrackingInfo'), str) else data.get('layoutTrackingInfo', {})
-            except json.JSONDecodeError:
-                layout_info = {}
-            
-            category_name = layout_info.get('categoryName')
-            
-            # Извлекаем название и бренд
-            name = ''
-            description = ''
-            brand = None
-
-            # Получаем бренд из иерархии категорий
-            hierarchy = layout_info.get('hierarchy', '')
-            if hierarchy:
-                brand = hierarchy.split('/')[-1]
-
-            # Получаем название из webAspects
-            aspects_widget_key = 'webAspects-3529295-default-1'
-            aspects_data = widget_states.get(aspects_widget_key)
-            
-            product_name = ''
-            
-            if aspects_data:
-                try:
-                    aspects = json.loads(aspects_data) if isinstance(aspects_data, str) else aspects_data
-                    
-                    if aspects.get('aspects'):
-                        variants = aspects['aspects'][0].get('variants', [])
-                        for variant in variants:
-                            if variant.get('active'):
-                                product_name = variant.get('data', {}).get('title', '')
-                                break
-                
-                except (json.JSONDecodeError, TypeError) as e:
-                    self.logger.error(f"Ошибка парсинга webAspects: {e}")
+        Ошибка основного ответа выбрасывается как FetchError; без описания
+        товар собирается, поэтому его ошибка дает None.
+        """
+        main_params, *description_params = self._product_params(product_id, profile)
+        # Оба запроса независимы, поэтому выполняем их одновременно
+        data, *description_data = await asyncio.gather(
+            self._request(self.api_url, main_params, raw),
+            *(self._make_request(self.api_url, params, raw) for params in description_params),
+        )
+        return data, description_data[0] if description_data else None
 
-            # Очищаем название от HTML-сущностей и лишних пробелов
-            if product_name:
-                product_name = html.unescape(product_name.strip())
-                product_name = ' '.join(product_name.split())
+    async def _fetch_product_data(self, product_id: str, profile: str = "full") -> Dict[str, Any]:
+        """Загружает основной ответ товара и блок описания и объединяет их"""
+        data, description_data = await self._fetch_product_bodies(product_id, profile)
+        return self._merge_description(data, description_data)
 
-            # Извлекаем цены
-            price = Price(original=0.0, final=None, card_price=None)
-            
-            # Пробуем получить цены из price_widget
-            if price_widget:
-                try:
-                    def clean_price(price_str: str) -> float:
-                        if not price_str:
-                            return 0.0
-                        cleaned = re.sub(r'[^\d.,]', '', str(price_str)).replace(',', '.').strip()
-                        if cleaned.count('.') > 1:
-                            parts = cleaned.split('.')
-                            cleaned = ''.join(parts[:-1]) + '.' + parts[-1]
-                        try:
-                            return float(cleaned)
-                        except ValueError as e:
-                            self.logger.error(f"Ошибка конвертации цены {cleaned}: {e}")
-                            return 0.0
-
-                    if isinstance(price_widget, dict):
-                        current_price = price_widget.get('price', '0')
-                        price.final = clean_price(current_price)
-
-                        original_price = price_widget.get('originalPrice', current_price)
-                        price.original = clean_price(original_price)
-                        
-                        card_price = price_widget.get('cardPrice', '0')
-                        price.card_price = clean_price(card_price)
-
-                        if price.original == 0 and price.final > 0:
-                            price.original = price.final
-
-                        show_original_price = price_widget.get('showOriginalPrice', False)
-                        if show_original_price and price.original > price.final:
-                            price.discount = price.original - price.final
-                            price.discount_percent = int(round((price.discount / price.original) * 100))
-
-                except Exception as e:
-                    self.logger.error(f"Ошибка при извлечении цен из price_widget: {e}")
-                    import traceback
-                    self.logger.error(traceback.format_exc())
-
-            # Извлекаем информацию о продавце
-            seller_data = seller_widget.get('seller', {}) if seller_widget else {}
-            seller = {
-                'id': seller_data.get('link', '').split('/')[-2] if seller_data.get('link') else None,
-                'name': seller_data.get('name'),
-                'logo': seller_data.get('logoImageUrl'),
-                'link': seller_data.get('link')
-            }
-            
-            # Извлекаем изображения
-            images = []
-            if gallery_widget:
-                cover_image = gallery_widget.get('coverImage')
-                if cover_image:
-                    images.append(cover_image)
-                gallery_images = [img.get('src') for img in gallery_widget.get('images', [])]
-                images.extend(gallery_images)
-            
-            # Если изображения не найдены в галерее, пробуем взять из schema.org
-            if not images and schema_data:
-                schema_images = schema_data.get('image')
-                if isinstance(schema_images, str):
-                    images.append(schema_images)
-                elif isinstance(schema_images, list):
-                    images.extend(schema_images)
-            
-            # Извлекаем рейтинг и отзывы
-            rating = 0.0
-            reviews_count = 0
-            if reviews_widget:
-                rating = float(reviews_widget.get('totalScore', 0))
-                reviews_count = int(reviews_widget.get('reviewsCount', 0))
-            elif schema_data and 'aggregateRating' in schema_data:
-                agg_rating = schema_data['aggregateRating']
-                if isinstance(agg_rating, dict):
-                    rating = float(agg_rating.get('ratingValue', 0))
-                    reviews_count = int(agg_rating.get('reviewCount', 0))
-            
-            # Извлекаем характеристики
-            characteristics = []
-            
-            # Сначала пробуем извлечь из webShortCharacteristics
-            if short_characteristics_widget:
-                try:
-                    # Проверяем новый формат характеристик
-                    if isinstance(short_characteristics_widget, dict) and 'characteristics' in short_characteristics_widget:
-                        for char in short_characteristics_widget['characteristics']:
-                            # Получаем название характеристики
-                            title_rs = char.get('title', {}).get('textRs', [])
-                            name = ''
-                            for text_block in title_rs:
-                                if text_block.get('type') == 'text':
-                                    name = text_block.get('content', '')
-                                    break
-                            
-                            # Получаем значения характеристики
-                            values = []
-                            for value_obj in char.get('values', []):
-                                if 'text' in value_obj:
-                                    values.append(value_obj['text'])
-                            
-                            # Объединяем все значения в одну строку
-                            value = ', '.join(str(v) for v in values if v)
-                            
-                            if name and value:
-                                characteristics.append(Characteristic(name=name, value=value))
-                    # Старый формат характеристик
-                    else:
-                        for char in short_characteristics_widget.get('characteristics', []):
-                            name = char.get('name', '')
-                            values = []
-                            
-                            # Собираем значения из разных возможных форматов
-                            if 'value' in char:
-                                values.append(str(char['value']))
-                            elif 'values' in char:
-                                if isinstance(char['values'], list):
-                                    values.extend(str(v) for v in char['values'])
-                                else:
-                                    values.append(str(char['values']))
-                            elif 'text' in char:
-                                values.append(str(char['text']))
-                            
-                            # Если есть единицы измерения, добавляем их
-                            if char.get('unit'):
-                                values = [f"{v} {char['unit']}" for v in values]
-                            
-                            # Объединяем все значения в одну строку
-                            value = ', '.join(str(v) for v in values if v)
-                            
-                            if name and value:
-                                characteristics.append(Characteristic(name=name, value=value))
-                except Exception as e:
-                    self.logger.error(f"Ошибка при извлечении коротких характеристик: {e}")
-                    import traceback
-                    self.logger.error(traceback.format_exc())
-            
-            # Если характеристики не найдены, пробуем извлечь из webCharacteristics
-            if not characteristics and characteristics_widget:
-                try:
-                    for group in characteristics_widget.get('characteristics', []):
-                        for char in group.get('short', []):
-                            name = char.get('name', '')
-                            value = char.get('value', '')
-                            if name and value:
-                                characteristics.append(Characteristic(name=name, value=str(value)))
-                except Exception as e:
-                    self.logger.error(f"Ошибка при извлечении полных характеристик: {e}")
-            
-            # Если характеристики все еще не найдены, пробуем извлечь из schema.org
-            if not characteristics and schema_data:
-                try:
-                    for prop_name, prop_value in schema_data.items():
-                        if prop_name.startswith('additional') and isinstance(prop_value, (str, int, float)):
-                            characteristics.append(Characteristic(
-                                name=prop_name.replace('additional', '').strip(),
-                                value=str(prop_value)
-                            ))
-                except Exception as e:
-                    self.logger.error(f"Ошибка при извлечении характеристик из schema.org: {e}")
-
-            # Извлекаем описание товара
-            description = ''
-            # Ищем виджет с описанием
-            widget_states = data.get('widgetStates', {})
-            description_widget_key = next(
-                (key for key in widget_states.keys() if 'webDescription' in key),
-                None
-            )
-            
-            if description_widget_key:
-                try:
-                    description_widget_data = widget_states[description_widget_key]
-                    if isinstance(description_widget_data, str):
-                        description_widget = json.loads(description_widget_data)
-                    else:
-                        description_widget = description_widget_data
-
-                    if isinstance(description_widget, dict):
-                        # Проверяем наличие richAnnotationJson
-                        rich_annotation = description_widget.get('richAnnotationJson', {})
-                        if rich_annotation:
-                            text_blocks = []
-                            
-                            def extract_text_from_blocks(blocks):
-                                for block in blocks:
-                                    # Извлекаем текст из title
-                                    if 'title' in block:
-                                        title_content = block['title'].get('content', [])
-                                        if isinstance(title_content, list):
-                                            text_blocks.extend(title_content)
-                                    
-                                    # Извлекаем текст из text.content
-                                    if 'text' in block:
-                                        text_data = block['text']
-                                        if isinstance(text_data, dict) and 'content' in text_data:
-                                            content = text_data['content']
-                                            if isinstance(content, list):
-                                                text_blocks.extend(content)
-                                        elif isinstance(text_data, list):
-                                            text_blocks.extend(text_data)
-                            
-                            # Обрабатываем основной контент
-                            for content_block in rich_annotation.get('content', []):
-                                # Проверяем наличие blocks
-                                if 'blocks' in content_block:
-                                    extract_text_from_blocks(content_block['blocks'])
-                                # Проверяем text и title напрямую
-                                if 'text' in content_block:
-                                    text_data = content_block['text']
-                                    if isinstance(text_data, dict) and 'content' in text_data:
-                                        text_blocks.extend(text_data['content'])
-                                if 'title' in content_block:
-                                    title_data = content_block['title']
-                                    if isinstance(title_data, dict) and 'content' in title_data:
-                                        text_blocks.extend(title_data['content'])
-                            
-                            # Фильтруем и объединяем текстовые блоки
-                            text_blocks = [block for block in text_blocks if block and isinstance(block, str)]
-                            description = '\n'.join(text_blocks)
-                        
-                        # Проверяем наличие HTML-формата описания
-                        elif 'richAnnotation' in description_widget:
-                            html_description = description_widget.get('richAnnotation', '')
-                            if html_description:
-                                # Заменяем HTML-теги на переносы строк
-                                description = html_description.replace('<br>', '\n')
-                                # Удаляем возможные оставшиеся HTML-теги
-                                description = re.sub(r'<[^>]+>', '', description)
-                        
-                        # Если richAnnotationJson не найден, пробуем старый формат
-                        else:
-                            content = description_widget.get('content', [])
-                            text_blocks = []
-                            
-                            def extract_text_from_content(content_items):
-                                for item in content_items:
-                                    if isinstance(item, dict):
-                                        if 'text' in item:
-                                            text_blocks.append(item['text'])
-                                        if 'content' in item and isinstance(item['content'], list):
-                                            extract_text_from_content(item['content'])
-                                        if 'textRs' in item:
-                                            for text_item in item['textRs']:
-                                                if text_item.get('type') == 'text':
-                                                    text_blocks.append(text_item.get('content', ''))
-                            
-                            extract_text_from_content(content)
-                            description = '\n'.join(text_blocks)
-                        
-                        # Очищаем описание
-                        description = html.unescape(description.strip())
-                        description = ' '.join(description.split())
-
-                except Exception as e:
-                    self.logger.error(f"Ошибка при извлечении описания из виджета: {e}")
-                    import traceback
-                    self.logger.error(traceback.format_exc())
-
-            if not description:
-                self.logger.warning("Описание товара не найдено")
-
-            # Создаем и возвращаем объект ProductDetails
-            product_details = ProductDetails(
-                id=product_id,
-                name=product_name,
-                brand=brand,
-                category=category_name,
-                price=price,
-                seller=seller,
-                characteristics=characteristics,
-                description=description,
-                images=images,
-                rating=rating,
-                reviews_count=reviews_count,
-                quantity=0,
-                sku_id=product_id,
-                parsed_at=datetime.now(),
-                url=f"https://www.ozon.ru/product/{product_id}/"
-            )
-            
-            self.logger.info(f"Создан объект ProductDetails с названием: {product_details.name}")
-            return product_details
+    async def get_product(self, product_id: str, profile: str = "full") -> Optional[ProductDetails]:
+        """Получает детальную информацию о конкретном продукте по его ID.
 
+        profile - набор полей из PRODUCT_PROFILES: "price" (цена, продавец, наличие),
+        "card" (плюс изображения и рейтинг) или "full". Профили без описания
+        обходятся одним запросом вместо двух. При ошибке возвращает None,
+        причину отдает fetch_product.
+        """
+        if profile not in PRODUCT_PROFILES:
+            raise ValueError(f"Неизвестный профиль товара: {profile}")
+        try:
+            return await self.fetch_product(product_id, profile)
         except Exception as e:
-            self.logger.error(f"Ошибка при извлечении деталей продукта: {e}")
-            import traceback
-            self.logger.error(traceback.format_exc())
+            self.logger.error(f"Ошибка при получении информации о продукте {product_id}: {e}")
             return None
 
-    async def get_product(self, product_id: str) -> Optional[ProductDetails]:
-        """Получает детальную информацию о конкретном продукте по его ID"""
-        try:
-            # Получаем основные данные
-            data = await self._make_request(
-                "https://www.ozon.ru/api/entrypoint-api.bx/page/json/v2",
-                {"url": f"/product/{product_id}"}
-            )
-            
-            if not data:
-                self.logger.error(f"Не удалось получить данные о продукте {product_id}")
-                return None
-            
-            # Получаем дополнительные данные с описанием
-            description_data = await self._make_request(
-                "https://www.ozon.ru/api/entrypoint-api.bx/page/json/v2",
-                {
-                    "url": f"/product/{product_id}",
-                    "layout_container": "pdpPage2column",
-                    "layout_page_index": 2
-                }
-            )
-            
-            # Объединяем данные
-            if description_data:
-                # Добавляем виджеты из description_data в основные данные
-                main_widget_states = data.get('widgetStates', {})
-                desc_widget_states = description_data.get('widgetStates', {})
-                
-                # Находим ключ виджета с описанием
-                description_widget_key = next(
-                    (key for key in desc_widget_states.keys() if 'webDescription' in key),
-                    None
+    async def fetch_product(self, product_id: str, profile: str = "full") -> ProductDetails:
+        """То же, что get_product, но при ошибке выбрасывает FetchError с причиной
+        (статус HTTP, ошибка разбора JSON, не удалось извлечь данные)"""
+        if profile not in PRODUCT_PROFILES:
+            raise ValueError(f"Неизвестный профиль товара: {profile}")
+        if self.extraction_pool:
+            # Разбор и извлечение выполняются в пуле процессов, цикл событий занят только сетью
+            body, description_body = await self._fetch_product_bodies(product_id, profile, raw=True)
+            with self.metrics.time("extract_product_details"):
+                product_details = await self.extraction_pool.extract_product(
+                    body, description_body, product_id, profile, self.metrics, self.compact
                 )
-                
-                if description_widget_key:
-                    main_widget_states[description_widget_key] = desc_widget_states[description_widget_key]
-                    data['widgetStates'] = main_widget_states
-            
+        else:
+            data = await self._fetch_product_data(product_id, profile)
             # Извлекаем детальную информацию
-            product_details = self._extract_product_details(data, product_id)
-            if not product_details:
-                self.logger.error(f"Не удалось извлечь информацию о продукте {product_id}")
-                return None
-            
-            return product_details
-            
-        except Exception as e:
-            self.logger.error(f"Ошибка при получении информации о продукте {product_id}: {e}")
-            return None
+            product_details = self._build_product(data, product_id, profile)
+
+        if not product_details:
+            raise FetchError("extract", "Не удалось извлечь данные о товаре из ответа")
+        return product_details
+
+    async def get_products(self, product_ids: Iterable[str], concurrency: int = 10,
+                           profile: str = "full") -> AsyncIterator[ProductFetchResult]:
+        """Загружает товары пачкой и отдает результаты по мере готовности.
+
+        Одновременно обрабатывается не более concurrency товаров. Ошибка по одному
+        товару (причина из FetchError) возвращается в поле error и не
+        останавливает остальные.
+        profile - набор полей, как в get_product.
+        """
+        if profile not in PRODUCT_PROFILES:
+            raise ValueError(f"Неизвестный профиль товара: {profile}")
+
+        async def fetch(product_id: str) -> ProductFetchResult:
+            product = await self.fetch_product(product_id, profile)
+            return ProductFetchResult(product_id=product_id, product=product)
+
+        async with aclosing(map_unordered(fetch, product_ids, concurrency)) as results:
+            async for product_id, result in results:
+                if isinstance(result, Exception):
+                    result = ProductFetchResult(product_id=product_id, error=str(result))
+                yield result
+
+    def _http_requests(self) -> int:
+        """Число фактически отправленных HTTP запросов (включая повторы)"""
+        histogram = self.metrics.histograms.get("http")
+        return histogram.count if histogram else 0
+
+    async def get_prices(self, sku_ids: Iterable[str], seller_ids: Iterable[str] = (),
+                         page_concurrency: int = 2, product_concurrency: int = 10) -> Dict[str, Any]:
+        """Цены набора SKU с минимумом запросов.
+
+        Сначала обходятся страницы продавцов seller_ids: одна страница поиска дает
+        цены десятков товаров. Запросов страниц отправляется не больше, чем SKU
+        еще не найдено (дальше карточки дешевле), обход прекращается, как только
+        найдены все SKU. Для оставшихся SKU загружаются карточки товаров с профилем "price".
+        requests_saved - сколько запросов сэкономлено по сравнению с загрузкой
+        карточки каждого SKU (одним запросом на SKU в профиле "price").
+        """
+        wanted = {str(sku_id) for sku_id in sku_ids}
+        prices: Dict[str, Any] = {}
+        started_requests = self._http_requests()
+
+        for seller in seller_ids:
+            # Бюджет - число запросов, а не загруженных страниц: страницы в работе тоже стоят запросов
+            budget = len(wanted) - len(prices) - (self._http_requests() - started_requests)
+            if self.probe_layout and not self._layout_probed:
+                # Подбор разметки запрашивает первую страницу в каждом варианте
+                budget -= len(PAGE_LAYOUTS) - 1
+            if budget <= 0:
+                break
+            async with aclosing(self.iter_pages(str(seller), page_concurrency, pages=range(1, budget + 1))) as pages:
+                async for page, result in pages:
+                    if result:
+                        for product in result.products:
+                            if product.sku_id in wanted:
+                                prices[product.sku_id] = product.price
+                    if self._http_requests() - started_requests >= len(wanted) - len(prices):
+                        # Все найдены или остальные страницы не окупятся
+                        break
+        from_pages = len(prices)
+
+        missing = [sku_id for sku_id in wanted if sku_id not in prices]
+        not_found = []
+        if missing:
+            async for fetched in self.get_products(missing, product_concurrency, profile="price"):
+                if fetched.product:
+                    prices[fetched.product_id] = fetched.product.price
+                else:
+                    not_found.append(fetched.product_id)
+
+        requests = self._http_requests() - started_requests
+        baseline = len(wanted) * len(self._product_params("", "price"))
+        return {
+            "prices": prices,
+            "from_pages": from_pages,
+            "from_products": len(prices) - from_pages,
+            "not_found": not_found,
+            "requests": requests,
+            "requests_saved": baseline - requests,
+        }
+
+def split_format_flag(user_input: str) -> Tuple[str, str]:
+    """Отделяет от ввода флаг формата сохранения (-parquet или -arrow), по умолчанию json"""
+    for output_format in OUTPUT_FORMATS:
+        if output_format != "json" and user_input.endswith(f"-{output_format}"):
+            return user_input[:-len(output_format) - 1].strip(), output_format
+    return user_input, "json"
+
 
 async def main():
     """Пример использования парсера"""
@@ -1039,28 +1044,56 @@ async def main():
     
     mode = input("\nВведите номер режима (1 или 2): ").strip()
     
+    # Создаем парсер
+    parser = OzonParser()
     try:
-        # Создаем парсер
-        parser = OzonParser()
-        
         if mode == "1":
             print("\nВведите ID продавца или полную ссылку на магазин.")
             print("Примеры:")
             print("1. ID продавца: 1179237")
             print("2. Ссылка: https://www.ozon.ru/seller/magazin-name-1179237/products/")
             print("Добавьте флаг -all для загрузки всех страниц")
+            print("или флаг -ndjson для потоковой записи всех страниц в NDJSON")
+            print("Флаг -parquet или -arrow в конце сохраняет товары в колоночном формате (нужен pyarrow)")
             
-            user_input = input("\nВведите ID или ссылку: ").strip()
+            user_input, output_format = split_format_flag(input("\nВведите ID или ссылку: ").strip())
             
-            # Проверяем наличие флага -all
+            # Проверяем наличие флагов -all и -ndjson
             collect_all = False
+            stream_ndjson = False
             if user_input.endswith("-all"):
                 collect_all = True
                 user_input = user_input.replace("-all", "").strip()
+            elif user_input.endswith("-ndjson"):
+                stream_ndjson = True
+                user_input = user_input.replace("-ndjson", "").strip()
             
             print("\nЗагрузка данных...")
             
-            if collect_all:
+            if stream_ndjson:
+                seller_id = parser._resolve_seller_id(user_input)
+                summary = await parser.crawl_to_ndjson(user_input, f"results/seller_{seller_id}_products.ndjson")
+                print(f"\nИнформация о продавце:")
+                print(f"ID продавца: {seller_id}")
+                print(f"Всего товаров: {summary['total_items']}")
+                if summary['resumed']:
+                    print(f"Добавлено в этом запуске: {summary['new_items']}")
+                print(f"Всего страниц: {summary['loaded_pages']}")
+                if summary['failed_pages']:
+                    print(f"Не загружены страницы: {summary['failed_pages']}")
+                print(f"\nРезультаты сохранены в файл: {summary['path']}")
+            elif collect_all and output_format != "json":
+                # Колоночный файл пишется блоками по мере загрузки страниц
+                seller_id = parser._resolve_seller_id(user_input)
+                path = f"results/seller_{seller_id}_all_products{OUTPUT_FORMATS[output_format]}"
+                summary = await parser.crawl_to_columnar(user_input, path, output_format=output_format)
+                print(f"\nИнформация о продавце:")
+                print(f"ID продавца: {seller_id}")
+                print(f"Всего товаров: {summary['total_items']}")
+                if summary['failed_pages']:
+                    print(f"Не загружены страницы: {summary['failed_pages']}")
+                print(f"\nРезультаты сохранены в файл: {summary['path']}")
+            elif collect_all:
                 # Получаем все страницы
                 results = await parser.get_all_pages(user_input)
                 if results:
@@ -1077,7 +1110,7 @@ async def main():
                 result = await parser.get_page(user_input, page=1)
                 if result:
                     # Сохраняем результат
-                    filename = parser.save_page_result(result)
+                    filename = parser.save_page_result(result, output_format=output_format)
                     print(f"\nИнформация о продавце:")
                     print(f"ID продавца: {result.metadata['seller_id']}")
                     print(f"Всего товаров: {result.pagination.total_items}")
@@ -1090,8 +1123,9 @@ async def main():
             print("Примеры:")
             print("1. ID товара: 1849590918")
             print("2. Ссылка: https://www.ozon.ru/product/1849590918")
+            print("Флаг -parquet или -arrow в конце сохраняет товар в колоночном формате (нужен pyarrow)")
             
-            user_input = input("\nВведите ID или ссылку: ").strip()
+            user_input, output_format = split_format_flag(input("\nВведите ID или ссылку: ").strip())
             
             # Извлекаем ID товара из ссылки если нужно
             if "ozon.ru" in user_input:
@@ -1105,12 +1139,7 @@ async def main():
             product = await parser.get_product(product_id)
             if product:
                 # Сохраняем результат
-                output_dir = "results"
-                os.makedirs(output_dir, exist_ok=True)
-                filename = f"{output_dir}/product_{product_id}.json"
-                
-                with open(filename, "w", encoding="utf-8") as f:
-                    json.dump(product.model_dump(), f, ensure_ascii=False, indent=2, default=str)
+                filename = parser.save_product(product, output_format=output_format)
                 
                 print(f"\nИнформация о товаре:")
                 print(f"Название: {product.name}")
@@ -1129,6 +1158,15 @@ async def main():
             
     except Exception as e:
         print(f"\nПроизошла ошибка при обработке запроса: {e}")
+    finally:
+        await parser.aclose()
+        if parser.metrics.histograms:
+            # Сводка по стадиям: где тратится время - сеть, разбор JSON, извлечение или запись
+            os.makedirs("results", exist_ok=True)
+            summary = parser.metrics.dump_summary("results/metrics.json")
+            print("\nВремя по стадиям:")
+            for stage, stats in summary['stages'].items():
+                print(f"{stage}: {stats['count']} раз, всего {stats['sum']:.3f} с, p95 {stats['p95']:.3f} с")
 
 if __name__ == "__main__":
     asyncio.run(main())
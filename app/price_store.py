@@ -0,0 +1,153 @@
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+from sqlalchemy import bindparam, insert, select, update
+from sqlalchemy.engine import Engine
+
+from database import create_db_engine
+from models import PriceObservation, ProductDetails, Seller, TrackedProduct
+from records import price_fingerprint
+
+# Ограничение числа параметров в одном IN (...) (у SQLite по умолчанию 999)
+SELECT_CHUNK = 500
+
+
+def _product_row(product: Any) -> Dict[str, Any]:
+    """Приводит Product, ProductRecord или ProductDetails к строке для записи"""
+    if isinstance(product, ProductDetails):
+        sku_id = product.sku_id or product.id
+        seller_id = product.seller.get('id')
+    else:
+        sku_id = product.sku_id
+        seller_id = product.seller_id
+    price = product.price
+    return {
+        'sku_id': str(sku_id),
+        'seller_id': str(seller_id) if seller_id else None,
+        'name': product.name,
+        'category': product.category,
+        'price_hash': price_fingerprint(price),
+        'original': price.original,
+        'discount': price.discount,
+        'discount_percent': price.discount_percent,
+        'final': price.final,
+        'card_price': price.card_price,
+    }
+
+
+class PriceHistoryStore:
+    """История цен в БД (таблицы sellers, products, price_observations).
+
+    write_products записывает пачку товаров (страницу или батч) в одной
+    транзакции пакетными executemany-вставками и обновлениями. Новая строка
+    истории добавляется только если отпечаток цены отличается от последнего.
+    """
+
+    def __init__(self, engine: Optional[Union[Engine, str]] = None):
+        self.engine = engine if isinstance(engine, Engine) else create_db_engine(engine)
+        self.products_table = TrackedProduct.__table__
+        self.sellers_table = Seller.__table__
+        self.observations_table = PriceObservation.__table__
+
+    def write_products(self, products: Iterable[Any], observed_at: Optional[datetime] = None) -> int:
+        """Записывает пачку товаров и возвращает количество новых наблюдений цены"""
+        # Последний товар с тем же SKU в пачке побеждает
+        rows = {row['sku_id']: row for row in map(_product_row, products) if row['sku_id']}
+        if not rows:
+            return 0
+        observed_at = observed_at or datetime.utcnow()
+
+        with self.engine.begin() as conn:
+            known_hashes = self._known_hashes(conn, list(rows))
+            self._insert_missing_sellers(conn, {row['seller_id'] for row in rows.values() if row['seller_id']})
+
+            new_products = [row for sku_id, row in rows.items() if sku_id not in known_hashes]
+            changed_products = [
+                row for sku_id, row in rows.items()
+                if sku_id in known_hashes and known_hashes[sku_id] != row['price_hash']
+            ]
+
+            if new_products:
+                conn.execute(insert(self.products_table), [
+                    {
+                        'sku_id': row['sku_id'],
+                        'seller_id': row['seller_id'],
+                        'name': row['name'],
+                        'category': row['category'],
+                        'last_price_hash': row['price_hash'],
+                        'first_seen_at': observed_at,
+                        'price_changed_at': observed_at,
+                    }
+                    for row in new_products
+                ])
+            if changed_products:
+                conn.execute(
+                    update(self.products_table)
+                    .where(self.products_table.c.sku_id == bindparam('b_sku_id'))
+                    .values(
+                        last_price_hash=bindparam('b_price_hash'),
+                        name=bindparam('b_name'),
+                        price_changed_at=bindparam('b_observed_at'),
+                    ),
+                    [
+                        {
+                            'b_sku_id': row['sku_id'],
+                            'b_price_hash': row['price_hash'],
+                            'b_name': row['name'],
+                            'b_observed_at': observed_at,
+                        }
+                        for row in changed_products
+                    ],
+                )
+
+            observations = [
+                {
+                    'sku_id': row['sku_id'],
+                    'original': row['original'],
+                    'discount': row['discount'],
+                    'discount_percent': row['discount_percent'],
+                    'final': row['final'],
+                    'card_price': row['card_price'],
+                    'observed_at': observed_at,
+                }
+                for row in new_products + changed_products
+            ]
+            if observations:
+                conn.execute(insert(self.observations_table), observations)
+        return len(observations)
+
+    def write_page(self, page: Any) -> int:
+        """Записывает товары страницы (PageResult или PageRecord) одной транзакцией"""
+        self.write_products(page.products)
+        return len(page.products)
+
+    def _known_hashes(self, conn, sku_ids: List[str]) -> Dict[str, int]:
+        known = {}
+        table = self.products_table
+        for start in range(0, len(sku_ids), SELECT_CHUNK):
+            chunk = sku_ids[start:start + SELECT_CHUNK]
+            result = conn.execute(select(table.c.sku_id, table.c.last_price_hash).where(table.c.sku_id.in_(chunk)))
+            known.update({sku_id: price_hash for sku_id, price_hash in result})
+        return known
+
+    def _insert_missing_sellers(self, conn, seller_ids: set) -> None:
+        if not seller_ids:
+            return
+        table = self.sellers_table
+        ids = list(seller_ids)
+        existing = set()
+        for start in range(0, len(ids), SELECT_CHUNK):
+            chunk = ids[start:start + SELECT_CHUNK]
+            existing.update(conn.execute(select(table.c.id).where(table.c.id.in_(chunk))).scalars())
+        missing = [{'id': seller_id} for seller_id in ids if seller_id not in existing]
+        if missing:
+            conn.execute(insert(table), missing)
+
+    def price_history(self, sku_id: str) -> List[Dict[str, Any]]:
+        """История цен товара от старых наблюдений к новым"""
+        table = self.observations_table
+        with self.engine.connect() as conn:
+            result = conn.execute(
+                select(table).where(table.c.sku_id == str(sku_id)).order_by(table.c.observed_at, table.c.id)
+            )
+            return [dict(row._mapping) for row in result]
@@ -0,0 +1,60 @@
+import re
+from functools import lru_cache
+from typing import Any, Iterable, List, Optional, Tuple
+
+# Первое число в строке цены; пробелы внутри числа (обычные, NBSP, тонкие) - разделители тысяч
+_NUMBER_RE = re.compile(r"\d(?:[\d.,\s]*\d)?")
+# Дробная часть: точка или запятая и 1-2 цифры в конце числа ("1 990,50", "12.5")
+_FRACTION_RE = re.compile(r"[.,](\d{1,2})$")
+# Лишние разделители (тысячи через точку или запятую: "1.234.567", "1,234")
+_SEPARATORS_RE = re.compile(r"[.,]")
+
+
+@lru_cache(maxsize=8192)
+def _parse_text(text: str) -> Optional[int]:
+    match = _NUMBER_RE.search(text)
+    if not match:
+        return None
+    number = "".join(match.group().split())
+    fraction = _FRACTION_RE.search(number)
+    if fraction:
+        kopecks = int(fraction.group(1).ljust(2, "0"))
+        number = number[:fraction.start()]
+    else:
+        kopecks = 0
+    rubles = _SEPARATORS_RE.sub("", number)
+    return int(rubles or 0) * 100 + kopecks
+
+
+def parse_kopecks(value: Any) -> Optional[int]:
+    """Цена в копейках из строки Ozon ("1 990 ₽", "1 990,50 ₽") или числа.
+
+    Возвращает None, если цифр нет. Строки кэшируются: одни и те же цены
+    повторяются на страницах продавца.
+    """
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return int(round(value * 100))
+    return _parse_text(str(value))
+
+
+def parse_prices(values: Iterable[Any]) -> List[Optional[int]]:
+    """Пакетный разбор: все строки цен страницы за один вызов, результат в копейках"""
+    parse = _parse_text
+    return [
+        parse(value) if isinstance(value, str) else parse_kopecks(value)
+        for value in values
+    ]
+
+
+def to_rubles(kopecks: Optional[int]) -> Optional[float]:
+    return kopecks / 100 if kopecks is not None else None
+
+
+def discount(original: int, final: int) -> Tuple[Optional[int], Optional[int]]:
+    """Скидка в копейках и в процентах; (None, None), если цена не снижена"""
+    if original <= final:
+        return None, None
+    amount = original - final
+    return amount, int(round(amount * 100 / original))
@@ -0,0 +1,128 @@
+import asyncio
+import random
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+# Статусы, при которых запрос повторяется с задержкой.
+# 403 Ozon отдает при срабатывании антибот-защиты, поэтому тоже считаем его сигналом замедлиться
+RETRY_STATUSES = {403, 429, 500, 502, 503, 504}
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Разбирает заголовок Retry-After (секунды или HTTP-дата) в секунды ожидания"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+def backoff_delay(attempt: int, base: float = 1.0, cap: float = 60.0) -> float:
+    """Экспоненциальная задержка с полным джиттером: случайное значение из [0, base * 2^attempt]"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class TokenBucket:
+    """Token bucket с адаптивной скоростью: при блокировке скорость падает вдвое, при успехах плавно растет"""
+
+    def __init__(self, rate: Optional[float], burst: Optional[float] = None, min_rate: float = 0.1):
+        self.max_rate = rate
+        self.rate = rate
+        self.min_rate = min(min_rate, rate) if rate else min_rate
+        self.capacity = burst if burst is not None else max(1.0, rate or 1.0)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    async def acquire(self) -> None:
+        """Ждет, пока бакет разрешит следующий запрос"""
+        # Ожидающие обслуживаются по очереди, поэтому темп не превышается даже при всплеске задач
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.blocked_until:
+                    await asyncio.sleep(self.blocked_until - now)
+                    continue
+                if not self.rate:
+                    return
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def block(self, delay: float) -> None:
+        """Запрещает запросы на delay секунд"""
+        now = time.monotonic()
+        self.blocked_until = max(self.blocked_until, now + delay)
+        self.tokens = 0.0
+        self.updated_at = max(now, self.blocked_until)
+
+    def decrease(self) -> None:
+        if self.rate:
+            self.rate = max(self.min_rate, self.rate / 2)
+
+    def increase(self) -> None:
+        if self.rate and self.rate < self.max_rate:
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+
+
+class RateLimiter:
+    """Ограничитель запросов с отдельным token bucket на каждый хост.
+
+    Один экземпляр разделяется всеми вызовами парсера. Любой объект с методами
+    acquire(url), on_success(url) и on_throttled(url, attempt, retry_after) может
+    быть передан в OzonParser вместо него.
+    """
+
+    def __init__(
+        self,
+        rate: Optional[float] = 1.0,
+        burst: Optional[float] = None,
+        per_host: Optional[Dict[str, float]] = None,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.per_host = per_host or {}
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.buckets: Dict[str, TokenBucket] = {}
+
+    def bucket(self, url: str) -> TokenBucket:
+        host = urlparse(url).netloc
+        if host not in self.buckets:
+            self.buckets[host] = TokenBucket(self.per_host.get(host, self.rate), self.burst)
+        return self.buckets[host]
+
+    async def acquire(self, url: str) -> None:
+        await self.bucket(url).acquire()
+
+    def on_success(self, url: str) -> None:
+        self.bucket(url).increase()
+
+    def on_throttled(self, url: str, attempt: int, retry_after: Optional[str] = None) -> float:
+        """Регистрирует отказ сервера и возвращает задержку до следующей попытки"""
+        delay = parse_retry_after(retry_after)
+        if delay is None:
+            delay = backoff_delay(attempt, self.base_delay, self.max_delay)
+        bucket = self.bucket(url)
+        bucket.decrease()
+        bucket.block(delay)
+        return delay
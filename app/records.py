@@ -0,0 +1,100 @@
+import hashlib
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from models import PageResult, Pagination, Price, Product
+
+
+@dataclass(slots=True)
+class PriceRecord:
+    """Компактный аналог Price без валидации Pydantic"""
+    original: float = 0.0
+    discount: Optional[float] = None
+    discount_percent: Optional[int] = None
+    final: Optional[float] = None
+    card_price: Optional[float] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'original': self.original,
+            'discount': self.discount,
+            'discount_percent': self.discount_percent,
+            'final': self.final,
+            'card_price': self.card_price,
+        }
+
+    def to_model(self) -> Price:
+        return Price(**self.to_dict())
+
+
+@dataclass(slots=True)
+class ProductRecord:
+    """Компактный аналог Product для больших выгрузок страниц продавца"""
+    name: str
+    price: PriceRecord
+    seller_id: str
+    sku_id: str
+    category: Optional[str] = None
+    quantity: Optional[int] = None
+    rating: Optional[float] = None
+    reviews: Optional[int] = None
+    images: List[str] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Словарь в том же виде, что и Product.model_dump()"""
+        return {
+            'name': self.name,
+            'category': self.category,
+            'price': self.price.to_dict(),
+            'seller_id': self.seller_id,
+            'quantity': self.quantity,
+            'rating': self.rating,
+            'reviews': self.reviews,
+            'images': self.images,
+            'sku_id': self.sku_id,
+        }
+
+    def to_model(self) -> Product:
+        return Product(**self.to_dict())
+
+
+@dataclass(slots=True)
+class PageRecord:
+    """Компактный аналог PageResult, содержит ProductRecord вместо Product"""
+    pagination: Pagination
+    products: List[ProductRecord]
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'pagination': self.pagination.model_dump(),
+            'products': [product.to_dict() for product in self.products],
+            'metadata': self.metadata,
+        }
+
+    def to_model(self) -> PageResult:
+        return PageResult(
+            pagination=self.pagination,
+            products=[product.to_model() for product in self.products],
+            metadata=self.metadata,
+        )
+
+
+def product_to_dict(product: Any) -> Dict[str, Any]:
+    """Приводит Product или ProductRecord к словарю для сохранения"""
+    if isinstance(product, ProductRecord):
+        return product.to_dict()
+    return product.model_dump()
+
+
+def page_to_dict(page: Any) -> Dict[str, Any]:
+    """Приводит PageResult или PageRecord к словарю для сохранения"""
+    if isinstance(page, PageRecord):
+        return page.to_dict()
+    return page.model_dump(exclude_none=False)
+
+
+def price_fingerprint(price: Any) -> int:
+    """Компактный 64-битный отпечаток полей цены (Price или PriceRecord) для поиска изменений"""
+    key = f"{price.original}|{price.final}|{price.card_price}|{price.discount}|{price.discount_percent}"
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big", signed=True)
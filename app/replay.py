@@ -0,0 +1,182 @@
+import asyncio
+import json
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+from urllib.parse import parse_qsl, urlencode
+
+import httpx
+
+from archive import read_archived
+from widgets import WidgetIndex
+
+logger = logging.getLogger(__name__)
+
+# Файлы ответов, сохраненные архивом: response_*.json, .json.gz, .json.zst
+RECORDED_PATTERNS = ("response_*.json", "response_*.json.gz", "response_*.json.zst")
+DEFAULT_LAYOUT = "categorySearchMegapagination"
+
+
+def seller_page_key(target: str) -> Optional[Tuple[str, int]]:
+    """(ID продавца, номер страницы) по адресу страницы продавца или None"""
+    path, _, query = target.partition("?")
+    if not path.startswith("/seller/"):
+        return None
+    seller_id = path.rstrip("/").split("/")[2].rsplit("-", 1)[-1]
+    return seller_id, int(dict(parse_qsl(query)).get("page", 1))
+
+
+def recorded_seller_page_key(widgets: WidgetIndex) -> Optional[Tuple[str, int]]:
+    """Определяет продавца и номер записанной страницы по ссылке paginator на следующую страницу.
+
+    Ответ не хранит адрес запроса, поэтому последнюю страницу (без nextPage)
+    привязать нельзя - она генерируется, как и все незаписанные страницы.
+    """
+    for paginator in widgets.get_all('paginator'):
+        next_page = paginator.get('nextPage') if isinstance(paginator, dict) else None
+        key = seller_page_key(next_page) if next_page else None
+        if key:
+            return key[0], key[1] - 1
+    return None
+
+
+def synthetic_tile(sku_id: int, seller_id: str) -> dict:
+    """Карточка товара в формате searchResultsV2 с детерминированными данными"""
+    price = 500 + sku_id % 9500
+    original = price + 100 + sku_id % 400
+    return {
+        "skuId": str(sku_id),
+        "action": {"link": f"/product/tovar-{sku_id}/?category=category-{sku_id % 5}"},
+        "mainState": [
+            {"type": "atom", "id": "atom", "atom": {"type": "priceV2", "priceV2": {"price": [
+                {"text": f"{price:,}".replace(",", " ") + " ₽", "textStyle": "PRICE"},
+                {"text": f"{original:,}".replace(",", " ") + " ₽", "textStyle": "ORIGINAL_PRICE"},
+            ]}}},
+            {"type": "atom", "id": "name", "atom": {"type": "textAtom", "textAtom": {"text": f"Товар {sku_id} продавца {seller_id}"}}},
+            {"type": "atom", "atom": {"type": "labelList", "labelList": {"items": [
+                {"icon": {"image": "ic_s_star_filled_compact"}, "title": f"{4 + sku_id % 10 / 10:.1f}  "},
+                {"icon": {"image": "ic_s_dialog_filled_compact"}, "title": f"{sku_id % 3000} отзывов"},
+            ]}}},
+        ],
+        "multiButton": {"ozonButton": {"addToCartButtonWithQuantity": {"maxItems": sku_id % 50}}},
+        "tileImage": {"items": [{"image": {"link": f"https://cdn1.ozone.ru/s3/multimedia/{sku_id}-{i}.jpg"}} for i in range(3)]},
+    }
+
+
+def synthetic_seller_page(seller_id: str, page: int, total_pages: int, items_per_page: int = 12,
+                          total_items: Optional[int] = None, layout_container: Optional[str] = DEFAULT_LAYOUT) -> bytes:
+    """Ответ страницы продавца: фильтр категорий, searchResultsV2, paginator со ссылкой
+    на следующую страницу и shared с пагинацией"""
+    total_items = total_items if total_items is not None else total_pages * items_per_page
+    offset = (page - 1) * items_per_page
+    first_sku = int(seller_id) * 1_000_000 + offset if seller_id.isdigit() else offset
+    filters = {"sections": [{"filters": [{"type": "categoryFilter", "categoryFilter": {"categories": [
+        {"title": f"Категория {i}", "urlValue": f"category-{i}", "level": 0} for i in range(5)
+    ]}}]}]}
+    items = [synthetic_tile(first_sku + i, seller_id) for i in range(min(items_per_page, total_items - offset))]
+    widget_states = {
+        "filtersDesktop-1890843-default-1": json.dumps(filters, ensure_ascii=False),
+        "searchResultsV2-226897-default-1": json.dumps({"items": items}, ensure_ascii=False),
+    }
+    if page < total_pages:
+        query = {"page": page + 1}
+        if layout_container:
+            query = {"layout_container": layout_container, "layout_page_index": page + 1, **query}
+        next_page = f"/seller/magazin-{seller_id}/products/?{urlencode(query)}"
+        widget_states["paginator-658722-default-1"] = json.dumps({"nextPage": next_page, "size": items_per_page})
+    data = {
+        "widgetStates": widget_states,
+        "shared": json.dumps({"catalog": {"totalPages": total_pages, "totalFound": total_items}}),
+    }
+    return json.dumps(data, ensure_ascii=False).encode()
+
+
+class ReplayTransport(httpx.AsyncBaseTransport):
+    """Транспорт httpx, отдающий записанные ответы вместо обращения к Ozon.
+
+    Ответы товара берутся из api_responses/ (основной ответ и блок описания
+    pdpPage2column) и отдаются для любого ID товара. Записанные страницы продавца
+    (со searchResultsV2) отдаются только для своих продавца и номера страницы,
+    остальные генерируются: seller_pages страниц по items_per_page товаров с
+    уникальными SKU. recorded_seller_pages=False - только сгенерированные страницы
+    (бенчмарки не должны зависеть от того, что архиватор записал в api_responses/).
+    full_page_size - размер страницы для запросов без layout_container (полная
+    страница списка), по умолчанию тот же. latency добавляет задержку к каждому ответу.
+    """
+
+    def __init__(self, directory: Union[str, Path] = "api_responses", seller_pages: int = 10,
+                 items_per_page: int = 12, latency: float = 0.0, full_page_size: Optional[int] = None,
+                 recorded_seller_pages: bool = True):
+        self.seller_pages = seller_pages
+        self.items_per_page = items_per_page
+        self.full_page_size = full_page_size or items_per_page
+        self.latency = latency
+        self.requests = 0
+        self.product_body: Optional[bytes] = None
+        self.description_body: Optional[bytes] = None
+        self.recorded_seller_pages = recorded_seller_pages
+        self.seller_bodies: Dict[Tuple[str, int], bytes] = {}
+        self._seller_cache: Dict[tuple, bytes] = {}
+        for path in self.recorded_files(directory):
+            self._classify(read_archived(path))
+
+    @staticmethod
+    def recorded_files(directory: Union[str, Path]) -> List[Path]:
+        directory = Path(directory)
+        return sorted(path for pattern in RECORDED_PATTERNS for path in directory.glob(pattern))
+
+    def _classify(self, body: bytes) -> None:
+        """Определяет по набору виджетов, какой запрос обслуживает записанный ответ"""
+        try:
+            widgets = WidgetIndex.from_response(json.loads(body))
+        except ValueError as e:
+            logger.warning(f"Пропущен записанный ответ: {e}")
+            return
+        if 'searchResultsV2' in widgets:
+            key = recorded_seller_page_key(widgets)
+            if key and self.recorded_seller_pages:
+                self.seller_bodies.setdefault(key, body)
+        elif 'webPrice' in widgets:
+            self.product_body = self.product_body or body
+        elif 'webDescription' in widgets:
+            self.description_body = self.description_body or body
+
+    def seller_page(self, seller_id: str, page: int, layout_container: Optional[str] = DEFAULT_LAYOUT) -> Optional[bytes]:
+        recorded = self.seller_bodies.get((seller_id, page))
+        if recorded is not None:
+            return recorded
+        size = self.items_per_page if layout_container else self.full_page_size
+        total_items = self.seller_pages * self.items_per_page
+        total_pages = -(-total_items // size)
+        if page > total_pages:
+            return None
+        key = (seller_id, page, layout_container)
+        body = self._seller_cache.get(key)
+        if body is None:
+            body = self._seller_cache[key] = synthetic_seller_page(
+                seller_id, page, total_pages, size, total_items, layout_container
+            )
+        return body
+
+    def route(self, request: httpx.Request) -> Optional[bytes]:
+        target = request.url.params.get("url", "")
+        path, _, query = target.partition("?")
+        # Параметры могут прийти отдельно или внутри url (адрес nextPage)
+        params = {**dict(parse_qsl(query)), **dict(request.url.params)}
+        if path.startswith("/seller/"):
+            seller_id, _ = seller_page_key(path)
+            return self.seller_page(seller_id, int(params.get("page", 1)), params.get("layout_container"))
+        if path.startswith("/product/"):
+            if params.get("layout_container") == "pdpPage2column":
+                return self.description_body
+            return self.product_body
+        return None
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        body = self.route(request)
+        if body is None:
+            return httpx.Response(404, content=b"not recorded", request=request)
+        return httpx.Response(200, headers={"Content-Type": "application/json"}, content=body, request=request)
@@ -0,0 +1,180 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import random
+import sys
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import jsonlib
+from parser import PRODUCT_PROFILES, OzonParser
+
+logger = logging.getLogger(__name__)
+
+TARGET_KINDS = ("seller", "product")
+
+
+@dataclass
+class MonitorTarget:
+    """Цель мониторинга: продавец (все страницы) или отдельный товар"""
+    kind: str
+    id: str
+    interval: float = 3600.0  # период обновления в секундах
+    priority: int = 0  # меньше - важнее при одновременном сроке
+    profile: str = "full"  # набор полей товара (PRODUCT_PROFILES), для цен достаточно "price"
+
+    def __post_init__(self):
+        if self.kind not in TARGET_KINDS:
+            raise ValueError(f"Неизвестный тип цели: {self.kind}")
+        if self.profile not in PRODUCT_PROFILES:
+            raise ValueError(f"Неизвестный профиль товара: {self.profile}")
+        self.id = str(self.id)
+
+
+def load_targets(path: str) -> List[MonitorTarget]:
+    """Загружает цели из JSON файла.
+
+    Формат: {"sellers": [{"id": "520524", "interval": 3600, "priority": 0}, ...],
+             "products": [{"id": "1849590918", "interval": 600, "profile": "price"}, ...]}
+    """
+    with open(path, 'rb') as f:
+        config = jsonlib.loads(f.read())
+    targets = []
+    for kind in TARGET_KINDS:
+        for item in config.get(f"{kind}s", []):
+            targets.append(MonitorTarget(kind=kind, **item))
+    return targets
+
+
+class MonitorScheduler:
+    """Долгоживущий планировщик периодического мониторинга.
+
+    Все задачи используют один OzonParser (и его пул соединений и ограничитель
+    темпа). Первые запуски равномерно разносятся по интервалу каждой цели,
+    чтобы не создавать всплеск запросов при старте. stats() показывает
+    глубину очереди просроченных задач и отставание от расписания.
+    """
+
+    def __init__(
+        self,
+        parser: OzonParser,
+        targets: List[MonitorTarget],
+        workers: int = 4,
+        on_result: Optional[Callable[[MonitorTarget, Any], Awaitable[None]]] = None,
+        page_concurrency: int = 2,
+        jitter: float = 0.1,
+    ):
+        self.parser = parser
+        self.workers = workers
+        self.on_result = on_result
+        self.page_concurrency = page_concurrency
+        self.jitter = jitter
+        self.runs = 0
+        self.failures = 0
+        self._heap: List[tuple] = []
+        self._counter = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._stopped = asyncio.Event()
+        # Наступившие задачи: при отставании сначала выполняются более приоритетные
+        self._ready: asyncio.PriorityQueue = asyncio.PriorityQueue()
+        # Плановые сроки задач, уже переданных воркерам, но еще не начатых
+        self._ready_dues: Dict[int, float] = {}
+        now = time.monotonic()
+        for target in targets:
+            # Разносим первые запуски по интервалу цели
+            self._push(now + random.uniform(0, target.interval), target)
+
+    def _push(self, due: float, target: MonitorTarget) -> None:
+        heapq.heappush(self._heap, (due, target.priority, next(self._counter), target))
+        self._wakeup.set()
+
+    def add_target(self, target: MonitorTarget, delay: float = 0.0) -> None:
+        self._push(time.monotonic() + delay, target)
+
+    def stats(self) -> Dict[str, Any]:
+        """Глубина очереди и отставание от расписания (в секундах)"""
+        now = time.monotonic()
+        overdue = [due for due, *_ in self._heap if due <= now] + list(self._ready_dues.values())
+        lags = [now - due for due in overdue]
+        return {
+            "scheduled": len(self._heap) + len(self._ready_dues),
+            "queue_depth": len(overdue),
+            "max_lag": max(lags, default=0.0),
+            "runs": self.runs,
+            "failures": self.failures,
+        }
+
+    async def _dispatch(self) -> None:
+        """Переносит наступившие задачи из расписания в очередь воркеров"""
+        while True:
+            self._wakeup.clear()
+            now = time.monotonic()
+            while self._heap and self._heap[0][0] <= now:
+                due, _, seq, target = heapq.heappop(self._heap)
+                self._ready_dues[seq] = due
+                self._ready.put_nowait((target.priority, due, seq, target))
+            timeout = self._heap[0][0] - now if self._heap else None
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _worker(self) -> None:
+        while True:
+            _, due, seq, target = await self._ready.get()
+            self._ready_dues.pop(seq, None)
+            started = time.monotonic()
+            try:
+                result = await self.run_target(target)
+                if self.on_result:
+                    await self.on_result(target, result)
+            except Exception as e:
+                self.failures += 1
+                logger.error(f"Ошибка мониторинга {target.kind} {target.id}: {e}")
+            finally:
+                self.runs += 1
+                self._ready.task_done()
+            # Следующий запуск отсчитывается от планового срока, с небольшим джиттером против синхронизации целей
+            next_due = max(due + target.interval, started)
+            self._push(next_due + random.uniform(0, self.jitter * target.interval), target)
+
+    async def run_target(self, target: MonitorTarget) -> Any:
+        if target.kind == "seller":
+            return await self.parser.get_all_pages(target.id, concurrency=self.page_concurrency)
+        return await self.parser.get_product(target.id, target.profile)
+
+    async def run(self) -> None:
+        """Работает до отмены задачи или вызова stop()"""
+        self._stopped.clear()
+        tasks = [asyncio.create_task(self._dispatch())]
+        tasks += [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        try:
+            await self._stopped.wait()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+
+async def main(targets_path: str = "targets.json", stats_interval: float = 60.0):
+    """Запуск мониторинга целей из файла с периодическим выводом статистики"""
+    targets = load_targets(targets_path)
+    async with OzonParser() as parser:
+        scheduler = MonitorScheduler(parser, targets)
+        runner = asyncio.create_task(scheduler.run())
+        try:
+            while not runner.done():
+                await asyncio.sleep(stats_interval)
+                print(f"Планировщик: {scheduler.stats()}")
+        finally:
+            scheduler.stop()
+            await runner
+
+
+if __name__ == "__main__":
+    asyncio.run(main(*sys.argv[1:2]))
@@ -0,0 +1,159 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from aiohttp import web
+from sqlalchemy.engine import Engine
+
+import jsonlib
+from database import create_db_engine, create_session_factory
+from models import ApiRequest
+from parser import PRODUCT_PROFILES, OzonParser
+from records import page_to_dict
+
+logger = logging.getLogger(__name__)
+
+PARSER_KEY = web.AppKey("parser", OzonParser)
+
+
+class SingleFlight:
+    """Объединяет одинаковые одновременные запросы в один вызов.
+
+    Пока вызов с ключом key выполняется, остальные запросы с тем же ключом
+    ждут его результата вместо повторного обращения к Ozon.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._flights: Dict[str, asyncio.Future] = {}
+        self.calls = 0
+        self.shared = 0
+
+    async def do(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        if not self.enabled:
+            self.calls += 1
+            return await func()
+        future = self._flights.get(key)
+        if future is not None:
+            self.shared += 1
+            # shield: отмена одного клиента не должна отменять общий запрос
+            return await asyncio.shield(future)
+        self.calls += 1
+        future = asyncio.ensure_future(func())
+        self._flights[key] = future
+        future.add_done_callback(lambda _: self._flights.pop(key, None))
+        return await asyncio.shield(future)
+
+
+def json_response(data: Any, status: int = 200) -> web.Response:
+    return web.Response(body=jsonlib.dumps(data), status=status, content_type="application/json")
+
+
+class PriceApi:
+    """HTTP API поверх OzonParser с объединением одинаковых запросов"""
+
+    def __init__(self, session_factory=None, all_pages_concurrency: int = 4, coalesce: bool = True):
+        self.flights = SingleFlight(enabled=coalesce)
+        self.session_factory = session_factory
+        self.all_pages_concurrency = all_pages_concurrency
+
+    async def get_product(self, request: web.Request) -> web.Response:
+        product_id = request.match_info["product_id"]
+        profile = request.query.get("profile", "full")
+        if profile not in PRODUCT_PROFILES:
+            return json_response({"error": f"Неизвестный профиль: {profile}"}, status=400)
+        parser = request.app[PARSER_KEY]
+        product = await self.flights.do(
+            f"product:{product_id}:{profile}", lambda: parser.get_product(product_id, profile)
+        )
+        if not product:
+            return json_response({"error": f"Товар {product_id} не найден"}, status=404)
+        return json_response(product.model_dump())
+
+    async def get_seller_page(self, request: web.Request) -> web.Response:
+        seller_id = request.match_info["seller_id"]
+        page = int(request.match_info["page"])
+        parser = request.app[PARSER_KEY]
+        result = await self.flights.do(
+            f"seller:{seller_id}:page:{page}", lambda: parser.get_page(seller_id, page=page)
+        )
+        if not result:
+            return json_response({"error": f"Страница {page} продавца {seller_id} не найдена"}, status=404)
+        return json_response(page_to_dict(result))
+
+    async def get_seller_all(self, request: web.Request) -> web.Response:
+        seller_id = request.match_info["seller_id"]
+        parser = request.app[PARSER_KEY]
+        results = await self.flights.do(
+            f"seller:{seller_id}:all",
+            lambda: parser.get_all_pages(seller_id, concurrency=self.all_pages_concurrency)
+        )
+        if not results:
+            return json_response({"error": f"Продавец {seller_id} не найден"}, status=404)
+        return json_response({
+            "seller_id": seller_id,
+            "total_pages": len(results),
+            "pages": [page_to_dict(result) for result in results],
+        })
+
+    async def get_metrics(self, request: web.Request) -> web.Response:
+        """Метрики парсера в формате Prometheus, ?format=json - JSON сводка"""
+        metrics = request.app[PARSER_KEY].metrics
+        if request.query.get("format") == "json":
+            return json_response(metrics.summary())
+        return web.Response(text=metrics.to_prometheus(), content_type="text/plain")
+
+    def _record_request(self, method: str, url: str, status_code: int, response_time: float) -> None:
+        with self.session_factory() as session:
+            session.add(ApiRequest(method=method, url=url, status_code=status_code, response_time=response_time))
+            session.commit()
+
+    @web.middleware
+    async def record_latency(self, request: web.Request, handler) -> web.StreamResponse:
+        """Записывает метод, URL, статус и время ответа каждого вызова в таблицу api_requests"""
+        started = time.perf_counter()
+        status = 500
+        try:
+            response = await handler(request)
+            status = response.status
+            return response
+        except web.HTTPException as e:
+            status = e.status
+            raise
+        finally:
+            if self.session_factory:
+                elapsed = time.perf_counter() - started
+                try:
+                    await asyncio.to_thread(self._record_request, request.method, str(request.rel_url), status, elapsed)
+                except Exception as e:
+                    logger.error(f"Ошибка записи ApiRequest: {e}")
+
+
+def create_app(parser: Optional[OzonParser] = None, engine: Optional[Engine] = None,
+               record_requests: bool = True, coalesce: bool = True) -> web.Application:
+    """Создает приложение; без parser создается собственный OzonParser на время работы сервера"""
+    session_factory = None
+    if record_requests:
+        session_factory = create_session_factory(engine or create_db_engine())
+    api = PriceApi(session_factory, coalesce=coalesce)
+    app = web.Application(middlewares=[api.record_latency])
+    app.add_routes([
+        web.get("/products/{product_id}", api.get_product),
+        web.get("/sellers/{seller_id}/pages/{page:\\d+}", api.get_seller_page),
+        web.get("/sellers/{seller_id}/all", api.get_seller_all),
+        web.get("/metrics", api.get_metrics),
+    ])
+
+    async def parser_context(app: web.Application):
+        app[PARSER_KEY] = parser or OzonParser()
+        yield
+        if parser is None:
+            await app[PARSER_KEY].aclose()
+
+    app.cleanup_ctx.append(parser_context)
+    return app
+
+
+if __name__ == "__main__":
+    web.run_app(create_app(), port=8000)
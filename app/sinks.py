@@ -0,0 +1,224 @@
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:  # pyarrow необязателен, без него доступна только запись JSON/NDJSON
+    pyarrow = None
+
+import jsonlib
+from archive import compress, open_decompressed, resolve_compression
+from records import product_to_dict
+
+# Колонки выгрузки: вложенные price и seller разворачиваются в price_*/seller_*,
+# изображения остаются колонкой-списком
+PRICE_COLUMNS = (
+    ("price_original", "float64"),
+    ("price_discount", "float64"),
+    ("price_discount_percent", "int64"),
+    ("price_final", "float64"),
+    ("price_card_price", "float64"),
+)
+PRODUCT_COLUMNS = (
+    ("sku_id", "string"),
+    ("name", "string"),
+    ("category", "string"),
+    ("seller_id", "string"),
+    *PRICE_COLUMNS,
+    ("quantity", "int64"),
+    ("rating", "float64"),
+    ("reviews", "int64"),
+    ("images", "list<string>"),
+)
+PRODUCT_DETAILS_COLUMNS = (
+    ("id", "string"),
+    ("sku_id", "string"),
+    ("name", "string"),
+    ("brand", "string"),
+    ("category", "string"),
+    *PRICE_COLUMNS,
+    ("seller_id", "string"),
+    ("seller_name", "string"),
+    ("seller_logo", "string"),
+    ("seller_link", "string"),
+    ("characteristics", "list<characteristic>"),
+    ("description", "string"),
+    ("images", "list<string>"),
+    ("rating", "float64"),
+    ("reviews_count", "int64"),
+    ("quantity", "int64"),
+    ("is_available", "bool"),
+    ("parsed_at", "timestamp"),
+    ("url", "string"),
+)
+COLUMNAR_FORMATS = {".parquet": "parquet", ".arrow": "arrow", ".feather": "arrow"}
+
+
+class NdjsonSink:
+    """Потоковая запись товаров в NDJSON: одна строка JSON на товар.
+
+    Каждая страница пишется одним блоком и сразу сбрасывается на диск. При
+    сжатии (gzip/zstd) блок страницы - отдельный фрейм; склеенные фреймы
+    читаются обычными gzip/zstd, поэтому файл после любой записанной
+    страницы остается корректным, даже если загрузка прервется.
+    """
+
+    def __init__(self, path: Union[str, Path], compression: Optional[str] = None, append: bool = False):
+        self.path = Path(path)
+        self.compression = resolve_compression(compression)
+        self.append = append
+        self.items_written = 0
+        self._file = None
+
+    def open(self) -> "NdjsonSink":
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "ab" if self.append else "wb")
+        return self
+
+    def write_page(self, page: Any) -> int:
+        """Записывает товары страницы (PageResult или PageRecord), возвращает их количество"""
+        lines = b"".join(jsonlib.dumps(product_to_dict(product)) + b"\n" for product in page.products)
+        if lines:
+            self._file.write(compress(lines, self.compression))
+            self._file.flush()
+        self.items_written += len(page.products)
+        return len(page.products)
+
+    def tell(self) -> int:
+        """Размер записанных данных в байтах (граница последней целиком записанной страницы)"""
+        return self._file.tell()
+
+    def close(self) -> None:
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self) -> "NdjsonSink":
+        return self.open()
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+
+def read_ndjson(path: Union[str, Path], compression: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """Читает товары из файла NdjsonSink (сжатие - как при записи)"""
+    with open(path, "rb") as f:
+        for line in open_decompressed(f, resolve_compression(compression)):
+            if line.strip():
+                yield jsonlib.loads(line)
+
+
+def flatten_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Разворачивает вложенные словари (price, seller) в колонки price_*, seller_*"""
+    flat = {}
+    for key, value in row.items():
+        if isinstance(value, dict):
+            for nested_key, nested_value in value.items():
+                flat[f"{key}_{nested_key}"] = nested_value
+        else:
+            flat[key] = value
+    return flat
+
+
+def _arrow_type(name: str) -> Any:
+    """Тип pyarrow по имени из описания колонок"""
+    types = {
+        "string": pyarrow.string,
+        "int64": pyarrow.int64,
+        "float64": pyarrow.float64,
+        "bool": pyarrow.bool_,
+        "timestamp": lambda: pyarrow.timestamp("us"),
+        "list<string>": lambda: pyarrow.list_(pyarrow.string()),
+        "list<characteristic>": lambda: pyarrow.list_(
+            pyarrow.struct([("name", pyarrow.string()), ("value", pyarrow.string())])
+        ),
+    }
+    if name not in types:
+        raise ValueError(f"Неизвестный тип колонки: {name}")
+    return types[name]()
+
+
+class ColumnarSink:
+    """Потоковая запись товаров в Parquet или Arrow IPC.
+
+    Товары копятся по колонкам и записываются блоками (row group в Parquet,
+    record batch в Arrow) по row_group_size строк. Формат определяется по
+    расширению файла (.parquet, .arrow/.feather) или задается явно. Нужен пакет
+    pyarrow. Файл становится читаемым только после close(), поэтому, в отличие
+    от NdjsonSink, дописывание после сбоя не поддерживается.
+    """
+
+    def __init__(self, path: Union[str, Path], output_format: Optional[str] = None,
+                 columns: Tuple[Tuple[str, str], ...] = PRODUCT_COLUMNS,
+                 row_group_size: int = 50_000, compression: str = "zstd"):
+        if pyarrow is None:
+            raise ValueError("Для записи Parquet/Arrow установите пакет pyarrow")
+        self.path = Path(path)
+        self.format = output_format or COLUMNAR_FORMATS.get(self.path.suffix)
+        if self.format not in ("parquet", "arrow"):
+            raise ValueError(f"Неизвестный формат выгрузки: {self.format or self.path.suffix}")
+        self.columns = columns
+        self.row_group_size = row_group_size
+        self.compression = compression
+        self.schema = pyarrow.schema([(name, _arrow_type(kind)) for name, kind in columns])
+        self.items_written = 0
+        self._buffer: Dict[str, List[Any]] = {name: [] for name, _ in columns}
+        self._buffered = 0
+        self._writer = None
+
+    def open(self) -> "ColumnarSink":
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if self.format == "parquet":
+            self._writer = pyarrow.parquet.ParquetWriter(self.path, self.schema, compression=self.compression)
+        else:
+            options = pyarrow.ipc.IpcWriteOptions(compression=self.compression)
+            self._writer = pyarrow.ipc.new_file(str(self.path), self.schema, options=options)
+        return self
+
+    def write_rows(self, rows: Iterable[Dict[str, Any]]) -> int:
+        """Добавляет строки (словари товаров), возвращает их количество"""
+        count = 0
+        for row in rows:
+            row = flatten_row(row)
+            for name, values in self._buffer.items():
+                values.append(row.get(name))
+            count += 1
+            self._buffered += 1
+            if self._buffered >= self.row_group_size:
+                self.flush()
+        self.items_written += count
+        return count
+
+    def write_page(self, page: Any) -> int:
+        """Записывает товары страницы (PageResult или PageRecord), возвращает их количество"""
+        return self.write_rows(product_to_dict(product) for product in page.products)
+
+    def write_product(self, product: Any) -> int:
+        """Записывает один товар (ProductDetails или Product)"""
+        return self.write_rows([product.model_dump()])
+
+    def flush(self) -> None:
+        """Записывает накопленные строки отдельным блоком"""
+        if not self._buffered:
+            return
+        batch = pyarrow.RecordBatch.from_pydict(self._buffer, schema=self.schema)
+        if self.format == "parquet":
+            self._writer.write_batch(batch, row_group_size=self.row_group_size)
+        else:
+            self._writer.write_batch(batch)
+        self._buffer = {name: [] for name, _ in self.columns}
+        self._buffered = 0
+
+    def close(self) -> None:
+        if self._writer:
+            self.flush()
+            self._writer.close()
+            self._writer = None
+
+    def __enter__(self) -> "ColumnarSink":
+        return self.open()
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
@@ -0,0 +1,72 @@
+import logging
+from typing import Any, Dict, List, Optional
+
+import jsonlib
+
+logger = logging.getLogger(__name__)
+
+# Значение-заглушка для виджетов, JSON которых не удалось разобрать
+_INVALID = object()
+
+
+def widget_type(key: str) -> str:
+    """Возвращает тип виджета из ключа widgetStates: 'webPrice-3121879-default-1' -> 'webPrice'"""
+    return key.split('-', 1)[0]
+
+
+class WidgetIndex:
+    """Индекс widgetStates одного ответа API.
+
+    Строится за один проход по ключам и сопоставляет тип виджета с его ключами,
+    поэтому экстракторы не зависят от числовых ID виджетов. JSON каждого виджета
+    разбирается лениво, при первом обращении, и не более одного раза.
+    """
+
+    def __init__(self, widget_states: Optional[Dict[str, Any]] = None):
+        self.widget_states = widget_states or {}
+        self._keys: Dict[str, List[str]] = {}
+        for key in self.widget_states:
+            self._keys.setdefault(widget_type(key), []).append(key)
+        self._decoded: Dict[str, Any] = {}
+        self.decode_count = 0
+
+    @classmethod
+    def from_response(cls, data: Dict[str, Any]) -> "WidgetIndex":
+        return cls(data.get('widgetStates', {}))
+
+    def __contains__(self, widget_type_name: str) -> bool:
+        return widget_type_name in self._keys
+
+    def keys(self, widget_type_name: str) -> List[str]:
+        """Ключи всех виджетов заданного типа в порядке ответа"""
+        return self._keys.get(widget_type_name, [])
+
+    def decode(self, key: str) -> Optional[Any]:
+        """Возвращает разобранное содержимое виджета по ключу"""
+        value = self._decoded.get(key)
+        if value is None:
+            raw = self.widget_states.get(key)
+            if isinstance(raw, str):
+                self.decode_count += 1
+                try:
+                    value = jsonlib.loads(raw)
+                except jsonlib.DECODE_ERRORS as e:
+                    logger.error(f"Ошибка парсинга виджета {key}: {e}")
+                    value = _INVALID
+            else:
+                value = raw if raw is not None else _INVALID
+            self._decoded[key] = value
+        return None if value is _INVALID else value
+
+    def get(self, widget_type_name: str) -> Optional[Any]:
+        """Содержимое первого корректного виджета заданного типа"""
+        for key in self.keys(widget_type_name):
+            value = self.decode(key)
+            if value is not None:
+                return value
+        return None
+
+    def get_all(self, widget_type_name: str) -> List[Any]:
+        """Содержимое всех корректных виджетов заданного типа"""
+        values = (self.decode(key) for key in self.keys(widget_type_name))
+        return [value for value in values if value is not None]
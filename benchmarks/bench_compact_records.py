@@ -0,0 +1,75 @@
+"""Память и скорость извлечения/сохранения товаров: Pydantic модели против компактных записей.
+
+Генерирует синтетические плитки searchResultsV2 (по умолчанию 100 000), прогоняет их
+через _extract_products и сериализацию как в save_all_results.
+
+Запуск: python benchmarks/bench_compact_records.py [количество_плиток]
+"""
+import gc
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "app"))
+import jsonlib  # noqa: E402
+from parser import OzonParser  # noqa: E402
+from records import product_to_dict  # noqa: E402
+from widgets import WidgetIndex  # noqa: E402
+
+
+def make_tile(sku: int) -> dict:
+    return {
+        "skuId": str(sku),
+        "mainState": [
+            {"type": "atom", "id": "atom", "atom": {"priceV2": {"price": [
+                {"text": f"{1000 + sku % 5000} ₽"}, {"text": f"{2000 + sku % 5000} ₽"}]}}},
+            {"type": "atom", "id": "name", "atom": {"textAtom": {"text": f"Товар &quot;{sku}&quot;"}}},
+            {"atom": {"type": "labelList", "labelList": {"items": [
+                {"icon": {"image": "ic_s_star_filled_compact"}, "title": "4.8 "},
+                {"icon": {"image": "ic_s_dialog_filled_compact"}, "title": f"{sku % 900} отзывов"}]}}},
+        ],
+        "multiButton": {"ozonButton": {"addToCartButtonWithQuantity": {"maxItems": sku % 30}}},
+        "tileImage": {"items": [{"image": {"link": f"https://cdn1.ozone.ru/s3/multimedia-{sku}.jpg"}}]},
+    }
+
+
+def run(parser: OzonParser, widgets: WidgetIndex) -> None:
+    gc.collect()
+    start = time.perf_counter()
+    products = parser._extract_products({}, "520524", widgets)
+    extracted = time.perf_counter()
+    jsonlib.dumps({"products": [product_to_dict(product) for product in products]})
+    saved = time.perf_counter()
+    count = len(products)
+    del products
+
+    # Память замеряется отдельным прогоном: tracemalloc сильно замедляет выполнение
+    gc.collect()
+    tracemalloc.start()
+    products = parser._extract_products({}, "520524", widgets)
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del products
+
+    mode = "compact " if parser.compact else "pydantic"
+    print(f"  {mode}: извлечение {count / (extracted - start):9.0f} тов/с, "
+          f"сохранение {count / (saved - extracted):9.0f} тов/с, "
+          f"память товаров {retained / 2**20:7.1f} МБ")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    items = [make_tile(sku) for sku in range(count)]
+    print(f"плиток: {count}")
+    for compact in (False, True):
+        parser = OzonParser(archive=False, compact=compact)
+        # Индекс с уже разобранным виджетом, чтобы замер не включал json.loads всей страницы
+        widgets = WidgetIndex({"searchResultsV2-1-default-1": {"items": items},
+                               "filtersDesktop-1-default-1": {"sections": []}})
+        run(parser, widgets)
+
+
+if __name__ == "__main__":
+    main()
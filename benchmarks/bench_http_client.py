@@ -0,0 +1,76 @@
+"""Сравнение старого (клиент на каждый запрос) и пулового HTTP клиента парсера.
+
+Запуск: python benchmarks/bench_http_client.py [количество_запросов]
+"""
+import asyncio
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "app"))
+from parser import OzonParser  # noqa: E402
+
+PAYLOAD = json.dumps({"widgetStates": {}, "shared": json.dumps({"catalog": {"totalPages": 1}})}).encode()
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(PAYLOAD)))
+        self.end_headers()
+        self.wfile.write(PAYLOAD)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stub_server() -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def bench_client_per_request(url: str, n: int) -> float:
+    """Старое поведение: новый синхронный httpx.Client на каждую страницу"""
+    start = time.perf_counter()
+    for page in range(n):
+        with httpx.Client(follow_redirects=True, timeout=30.0) as client:
+            client.get(url, params={"page": page})
+    return n / (time.perf_counter() - start)
+
+
+async def bench_pooled(url: str, n: int) -> float:
+    """Новое поведение: один AsyncClient парсера на все страницы"""
+    async with OzonParser(api_url=url) as parser:
+        start = time.perf_counter()
+        for page in range(n):
+            await parser.client.get(url, params={"page": page})
+        return n / (time.perf_counter() - start)
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    server = start_stub_server()
+    url = f"http://127.0.0.1:{server.server_address[1]}/api/entrypoint-api.bx/page/json/v2"
+    try:
+        before = bench_client_per_request(url, n)
+        after = asyncio.run(bench_pooled(url, n))
+    finally:
+        server.shutdown()
+    print(f"запросов: {n}")
+    print(f"до (клиент на запрос):   {before:8.1f} req/s")
+    print(f"после (пул соединений):  {after:8.1f} req/s")
+    print(f"ускорение: x{after / before:.2f}")
+
+
+if __name__ == "__main__":
+    main()
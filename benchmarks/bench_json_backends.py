@@ -0,0 +1,47 @@
+"""Декодирование сохраненных ответов api_responses/*.json каждым доступным JSON бэкендом.
+
+Декодируется сам ответ и все вложенные JSON строки (widgetStates, shared, seo,
+layoutTrackingInfo) - так же, как это делает парсер.
+
+Запуск: python benchmarks/bench_json_backends.py [повторы]
+"""
+import sys
+import timeit
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "app"))
+import jsonlib  # noqa: E402
+
+NESTED_FIELDS = ("shared", "seo", "layoutTrackingInfo")
+
+
+def decode_response(raw: bytes, backend: str) -> int:
+    data = jsonlib.loads(raw, backend=backend)
+    decoded = 1
+    for value in data.get("widgetStates", {}).values():
+        if isinstance(value, str):
+            jsonlib.loads(value, backend=backend)
+            decoded += 1
+    for field in NESTED_FIELDS:
+        if isinstance(data.get(field), str):
+            jsonlib.loads(data[field], backend=backend)
+            decoded += 1
+    return decoded
+
+
+def main():
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    samples = [path.read_bytes() for path in sorted((ROOT / "api_responses").glob("response_*.json"))]
+    total_bytes = sum(len(raw) for raw in samples)
+    documents = sum(decode_response(raw, "json") for raw in samples)
+    print(f"файлов: {len(samples)}, {total_bytes / 1024:.0f} КБ, JSON документов на проход: {documents}")
+    baseline = None
+    for backend in jsonlib.available_backends()[::-1]:
+        seconds = timeit.timeit(lambda: [decode_response(raw, backend) for raw in samples], number=number) / number
+        baseline = baseline or seconds
+        print(f"  {backend:8s} {seconds * 1e3:8.2f} мс/проход  {total_bytes / seconds / 2**20:8.1f} МБ/с  x{baseline / seconds:.2f}")
+
+
+if __name__ == "__main__":
+    main()
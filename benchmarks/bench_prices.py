@@ -0,0 +1,92 @@
+"""Бенчмарк разбора строк цен: прежние clean_price из parser.py против prices.py.
+
+Корпус - форматы цен, встречающиеся в ответах Ozon (NBSP, тонкие пробелы, ₽,
+копейки через запятую, подписи). Перед замером проверяется, что новый разбор
+дает ожидаемое значение в копейках для каждой строки корпуса.
+
+Запуск: python benchmarks/bench_prices.py [повторы]
+"""
+import re
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "app"))
+from prices import parse_kopecks, parse_prices  # noqa: E402
+
+# Строка цены -> ожидаемое значение в копейках
+CORPUS = {
+    "990 ₽": 99000,
+    "1 990 ₽": 199000,
+    "1 990 ₽": 199000,
+    "1 990 ₽": 199000,
+    "12 345 ₽": 1234500,
+    "1 234 567 ₽": 123456700,
+    "1 990,50 ₽": 199050,
+    "1 990,5 ₽": 199050,
+    "1990.99": 199099,
+    "1.234.567 ₽": 123456700,
+    "2,490": 249000,
+    "от 4 821 ₽": 482100,
+    "4 821 ₽ с Ozon Картой": 482100,
+    "5135": 513500,
+    "0 ₽": 0,
+    "Нет в наличии": None,
+    "": None,
+}
+
+
+def old_search_clean_price(price_text: str) -> float:
+    """Прежний clean_price из _extract_price_info"""
+    return float(re.sub(r'[^\d.]', '', price_text.replace(',', '.')))
+
+
+def old_details_clean_price(price_str: str) -> float:
+    """Прежний clean_price из _extract_product_details"""
+    if not price_str:
+        return 0.0
+    cleaned = re.sub(r'[^\d.,]', '', str(price_str)).replace(',', '.').strip()
+    if cleaned.count('.') > 1:
+        parts = cleaned.split('.')
+        cleaned = ''.join(parts[:-1]) + '.' + parts[-1]
+    try:
+        return float(cleaned)
+    except ValueError:
+        return 0.0
+
+
+def safe(func, text):
+    try:
+        return func(text)
+    except ValueError:
+        return None
+
+
+def main():
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    texts = list(CORPUS)
+
+    print(f"{'строка':28} {'ожидается':>12} {'prices.py':>12} {'старый 1':>12} {'старый 2':>12}")
+    wrong = []
+    for text, expected in CORPUS.items():
+        got = parse_kopecks(text)
+        if got != expected:
+            wrong.append(text)
+        print(f"{text!r:28} {expected!s:>12} {got!s:>12} "
+              f"{safe(old_search_clean_price, text)!s:>12} {safe(old_details_clean_price, text)!s:>12}")
+    if wrong:
+        raise SystemExit(f"Неверный разбор: {wrong}")
+
+    # Страница из 12 товаров по 2 цены, как в searchResultsV2
+    page = (texts * 2)[:24]
+    old = timeit.timeit(lambda: [safe(old_search_clean_price, text) for text in page], number=number)
+    single = timeit.timeit(lambda: [parse_kopecks(text) for text in page], number=number)
+    batch = timeit.timeit(lambda: parse_prices(page), number=number)
+    print(f"\nстраница из {len(page)} строк цен:")
+    print(f"  старый clean_price: {old / number * 1e6:8.1f} мкс")
+    print(f"  parse_kopecks:      {single / number * 1e6:8.1f} мкс  (x{old / single:.1f})")
+    print(f"  parse_prices:       {batch / number * 1e6:8.1f} мкс  (x{old / batch:.1f})")
+
+
+if __name__ == "__main__":
+    main()
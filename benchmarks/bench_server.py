@@ -0,0 +1,108 @@
+"""Нагрузочный тест HTTP сервиса: одинаковые одновременные запросы с объединением и без.
+
+Заглушка Ozon отвечает с задержкой, клиенты одновременно запрашивают
+небольшой набор товаров. Выводится число обращений к Ozon, задержки и пропускная способность.
+
+Запуск: python benchmarks/bench_server.py [клиентов] [разных_товаров]
+"""
+import asyncio
+import json
+import logging
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import httpx
+from aiohttp import web
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "app"))
+from database import create_db_engine  # noqa: E402
+from parser import OzonParser  # noqa: E402
+from server import create_app  # noqa: E402
+
+UPSTREAM_DELAY = 0.05
+PAYLOAD = json.dumps({
+    "widgetStates": {
+        "webPrice-3121879-default-1": json.dumps({"price": "1 990 ₽", "originalPrice": "2 490 ₽"}),
+        "webProductHeading-3385933-default-1": json.dumps({"title": "Тестовый товар"}),
+    },
+    "seo": {"title": "Тестовый товар"},
+}).encode()
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    calls = 0
+
+    def do_GET(self):
+        StubHandler.calls += 1
+        time.sleep(UPSTREAM_DELAY)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(PAYLOAD)))
+        self.end_headers()
+        self.wfile.write(PAYLOAD)
+
+    def log_message(self, *args):
+        pass
+
+
+async def run(upstream_url: str, clients: int, products: int, coalesce: bool) -> dict:
+    StubHandler.calls = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_db_engine(f"sqlite:///{tmp}/bench.db")
+        async with OzonParser(api_url=upstream_url, requests_per_second=None, archive=False) as parser:
+            runner = web.AppRunner(create_app(parser, engine=engine, coalesce=coalesce))
+            await runner.setup()
+            site = web.TCPSite(runner, "127.0.0.1", 0)
+            await site.start()
+            port = site._server.sockets[0].getsockname()[1]
+            latencies = []
+
+            async def call(client: httpx.AsyncClient, i: int):
+                started = time.perf_counter()
+                response = await client.get(f"http://127.0.0.1:{port}/products/{1000 + i % products}")
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - started)
+
+            limits = httpx.Limits(max_connections=clients)
+            async with httpx.AsyncClient(limits=limits, timeout=60.0) as client:
+                started = time.perf_counter()
+                await asyncio.gather(*(call(client, i) for i in range(clients)))
+                elapsed = time.perf_counter() - started
+            await runner.cleanup()
+        engine.dispose()
+    latencies.sort()
+    return {
+        "upstream": StubHandler.calls,
+        "rps": clients / elapsed,
+        "p50": statistics.median(latencies) * 1000,
+        "p95": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+    }
+
+
+def main():
+    logging.getLogger("parser").setLevel(logging.ERROR)
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    products = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    upstream_url = f"http://127.0.0.1:{server.server_address[1]}/api/entrypoint-api.bx/page/json/v2"
+    try:
+        print(f"клиентов: {clients}, разных товаров: {products}")
+        for coalesce in (False, True):
+            stats = asyncio.run(run(upstream_url, clients, products, coalesce))
+            label = "с объединением" if coalesce else "без объединения"
+            print(f"{label:16} запросов к Ozon: {stats['upstream']:4d}  {stats['rps']:8.1f} req/s  "
+                  f"p50 {stats['p50']:7.1f} ms  p95 {stats['p95']:7.1f} ms")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""Микро-бенчмарк поиска виджетов: линейные проходы по ключам против WidgetIndex.
+
+Запуск: python benchmarks/bench_widget_index.py [повторы]
+"""
+import json
+import sys
+import timeit
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "app"))
+from widgets import WidgetIndex  # noqa: E402
+
+# Типы виджетов, которые запрашивают экстракторы одного ответа
+LOOKUPS = [
+    "webGallery", "webPrice", "webReviewProductScore", "webStickyProducts",
+    "webCharacteristics", "webShortCharacteristics", "webAspects", "webDescription",
+    "searchResultsV2", "filtersDesktop",
+]
+
+
+def linear_scan(widget_states: dict) -> list:
+    """Прежний подход: отдельный проход по ключам и json.loads на каждый запрос виджета"""
+    found = []
+    for widget_type in LOOKUPS:
+        key = next((key for key in widget_states.keys() if widget_type in key), None)
+        found.append(json.loads(widget_states[key]) if key else None)
+    return found
+
+
+def indexed(widget_states: dict) -> tuple:
+    """WidgetIndex строится один раз и разделяется экстракторами"""
+    widgets = WidgetIndex(widget_states)
+    return [widgets.get(t) for t in LOOKUPS], [widgets.get(t) for t in LOOKUPS]
+
+
+def main():
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    for path in sorted((ROOT / "api_responses").glob("response_*.json")):
+        widget_states = json.loads(path.read_text(encoding="utf-8")).get("widgetStates", {})
+        # Повторный запрос тех же виджетов другим экстрактором (как в get_page/get_product)
+        scan = timeit.timeit(lambda: (linear_scan(widget_states), linear_scan(widget_states)), number=number)
+        index = timeit.timeit(lambda: indexed(widget_states), number=number)
+        print(f"{path.name}: {len(widget_states)} виджетов")
+        print(f"  линейный поиск: {scan / number * 1e6:9.1f} мкс/ответ")
+        print(f"  WidgetIndex:    {index / number * 1e6:9.1f} мкс/ответ  (x{scan / index:.1f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Офлайн бенчмарки парсера на записанных ответах api_responses/ через ReplayTransport.
+
+Замеряет get_page, get_all_pages на синтетическом продавце (в том числе с пулом
+процессов извлечения), get_product и экстракторы отдельно. Базовые результаты
+сохраняются и сравниваются средствами pytest-benchmark.
+
+Запуск: python -m pytest benchmarks/test_replay_benchmarks.py --benchmark-autosave
+        python -m pytest benchmarks/test_replay_benchmarks.py --benchmark-compare --benchmark-compare-fail=min:20%
+"""
+import asyncio
+import json
+import logging
+import sys
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "app"))
+from extraction import ExtractionPool  # noqa: E402
+from parser import OzonParser  # noqa: E402
+from replay import ReplayTransport, synthetic_seller_page  # noqa: E402
+from widgets import WidgetIndex  # noqa: E402
+
+SELLER_ID = "520524"
+PRODUCT_ID = "1849590918"
+PAGES = 100
+
+
+@pytest.fixture(scope="module", autouse=True)
+def quiet_logging():
+    logging.disable(logging.WARNING)
+    yield
+    logging.disable(logging.NOTSET)
+
+
+@pytest.fixture(scope="module")
+def transport():
+    transport = ReplayTransport(ROOT / "api_responses", seller_pages=PAGES, recorded_seller_pages=False)
+    if transport.product_body is None:
+        pytest.skip("В api_responses/ нет записанного ответа товара")
+    return transport
+
+
+@pytest.fixture(scope="module")
+def extraction_pool():
+    with ExtractionPool() as pool:
+        # Прогрев: запуск процессов не должен попадать в замер
+        list(pool.executor.map(abs, range(pool.workers * 2)))
+        yield pool
+
+
+def make_parser(transport: ReplayTransport, compact: bool = False,
+                extraction_pool: ExtractionPool = None) -> OzonParser:
+    return OzonParser(transport=transport, requests_per_second=None, archive=False, compact=compact,
+                      extraction_pool=extraction_pool)
+
+
+def test_get_page(benchmark, transport):
+    async def run():
+        async with make_parser(transport) as parser:
+            for page in range(1, 51):
+                await parser.get_page(SELLER_ID, page=page)
+
+    benchmark(lambda: asyncio.run(run()))
+
+
+@pytest.mark.parametrize("compact", [False, True], ids=["models", "compact"])
+def test_get_all_pages(benchmark, transport, compact):
+    async def run():
+        async with make_parser(transport, compact) as parser:
+            return await parser.get_all_pages(SELLER_ID, concurrency=8)
+
+    results = benchmark.pedantic(lambda: asyncio.run(run()), rounds=3, iterations=1)
+    assert len(results) == PAGES
+
+
+def test_get_all_pages_extraction_pool(benchmark, transport, extraction_pool):
+    async def run():
+        async with make_parser(transport, True, extraction_pool) as parser:
+            return await parser.get_all_pages(SELLER_ID, concurrency=8)
+
+    results = benchmark.pedantic(lambda: asyncio.run(run()), rounds=3, iterations=1)
+    assert len(results) == PAGES
+
+
+def test_get_product(benchmark, transport):
+    async def run():
+        async with make_parser(transport) as parser:
+            for _ in range(20):
+                product = await parser.get_product(PRODUCT_ID)
+        return product
+
+    assert benchmark(lambda: asyncio.run(run())) is not None
+
+
+def test_extract_products(benchmark, transport):
+    parser = make_parser(transport)
+    page_data = json.loads(synthetic_seller_page(SELLER_ID, 1, PAGES))
+    products = benchmark(lambda: parser._extract_products(page_data, SELLER_ID, WidgetIndex.from_response(page_data)))
+    assert len(products) == 12
+    asyncio.run(parser.aclose())
+
+
+def test_extract_product_details(benchmark, transport):
+    parser = make_parser(transport)
+    product_data = json.loads(transport.product_body)
+    if transport.description_body:
+        description = json.loads(transport.description_body)["widgetStates"]
+        for key in WidgetIndex(description).keys("webDescription"):
+            product_data["widgetStates"][key] = description[key]
+    details = benchmark(
+        lambda: parser._extract_product_details(product_data, PRODUCT_ID, WidgetIndex.from_response(product_data))
+    )
+    assert details is not None
+    asyncio.run(parser.aclose())
@@ -0,0 +1,123 @@
+"""Регрессионные тесты crawl_to_ndjson: продолжение после сбоя, разметка и остановка обхода (ReplayTransport)"""
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "app"))
+from parser import OzonParser  # noqa: E402
+from replay import DEFAULT_LAYOUT, ReplayTransport  # noqa: E402
+from sinks import read_ndjson  # noqa: E402
+
+SELLER_ID = "123"
+PAGES = 20
+ITEMS = PAGES * 12
+CAPTCHA = json.dumps({"widgetStates": {"captcha-3051530-default-1": "{}"}}).encode()
+
+
+class FlakyTransport(ReplayTransport):
+    """Синтетический продавец со сбоями.
+
+    failing - страницы без ответа (404), captcha - страницы с заглушкой антибота
+    вместо списка товаров, aliases - страницы с товарами другой страницы,
+    fail_layout_probe - нет ответа на первую страницу в разметке layout_container.
+    """
+
+    def __init__(self, directory: Path, failing=(), captcha=(), aliases=None,
+                 fail_layout_probe: bool = False, **kwargs):
+        super().__init__(directory, seller_pages=PAGES, **kwargs)
+        self.failing = set(failing)
+        self.captcha = set(captcha)
+        self.aliases = aliases or {}
+        self.fail_layout_probe = fail_layout_probe
+
+    def seller_page(self, seller_id, page, layout_container=DEFAULT_LAYOUT):
+        if page in self.captcha:
+            return CAPTCHA
+        if page in self.failing or (self.fail_layout_probe and page == 1 and layout_container):
+            return None
+        return super().seller_page(seller_id, self.aliases.get(page, page), layout_container)
+
+
+async def crawl(transport: ReplayTransport, path: Path, **kwargs) -> dict:
+    async with OzonParser(transport=transport, requests_per_second=None, archive=False, max_retries=0) as parser:
+        return await parser.crawl_to_ndjson(SELLER_ID, str(path), **kwargs)
+
+
+def skus(path: Path, compression=None) -> list:
+    return [row["sku_id"] for row in read_ndjson(path, compression)]
+
+
+@pytest.mark.asyncio
+async def test_resume_keeps_layout_when_probe_fails(tmp_path):
+    path = tmp_path / "out.ndjson"
+    checkpoint = Path(f"{path}.checkpoint.json")
+    # Полная страница меньше, поэтому при подборе выбирается разметка layout_container
+    result = await crawl(FlakyTransport(tmp_path, failing=range(5, PAGES + 1), full_page_size=6), path)
+    assert result["failed_pages"] == list(range(5, PAGES + 1))
+    assert json.loads(checkpoint.read_text())["page_layout"] == {"layout_container": DEFAULT_LAYOUT}
+
+    transport = FlakyTransport(tmp_path, fail_layout_probe=True, full_page_size=6)
+    result = await crawl(transport, path)
+    assert result["resumed"]
+    assert result["failed_pages"] == []
+    assert result["total_items"] == ITEMS
+    # Разметка берется из контрольной точки: запросы только за недостающими страницами
+    assert transport.requests == PAGES - 4
+    written = skus(path)
+    assert len(written) == len(set(written)) == ITEMS
+    assert not checkpoint.exists()
+
+
+@pytest.mark.asyncio
+async def test_failed_page_is_loaded_on_resume(tmp_path):
+    path = tmp_path / "out.ndjson.gz"
+    result = await crawl(FlakyTransport(tmp_path, failing={7}), path, compression="gzip")
+    assert result["failed_pages"] == [7]
+    assert result["total_items"] == ITEMS - 12
+
+    transport = FlakyTransport(tmp_path)
+    result = await crawl(transport, path, compression="gzip")
+    assert transport.requests == 1
+    assert result["failed_pages"] == []
+    assert (result["new_items"], result["total_items"]) == (12, ITEMS)
+    written = skus(path, "gzip")
+    assert len(written) == len(set(written)) == ITEMS
+
+
+@pytest.mark.asyncio
+async def test_resume_drops_skus_written_before(tmp_path):
+    path = tmp_path / "out.ndjson"
+    await crawl(FlakyTransport(tmp_path, failing={7}), path)
+
+    # Догружаемая страница повторяет товары уже записанной
+    result = await crawl(FlakyTransport(tmp_path, aliases={7: 2}), path)
+    assert result["failed_pages"] == []
+    assert (result["new_items"], result["duplicates"]) == (0, 12)
+    written = skus(path)
+    assert len(written) == len(set(written)) == ITEMS - 12
+
+
+@pytest.mark.asyncio
+async def test_pages_without_product_list_are_failed_not_stale(tmp_path):
+    path = tmp_path / "out.ndjson"
+    result = await crawl(FlakyTransport(tmp_path, captcha={3, 4, 5}), path)
+    assert not result["stopped_early"]
+    assert result["failed_pages"] == [3, 4, 5]
+    assert result["loaded_pages"] == PAGES - 3
+
+    result = await crawl(FlakyTransport(tmp_path), path)
+    assert result["failed_pages"] == []
+    assert result["total_items"] == ITEMS
+
+
+@pytest.mark.asyncio
+async def test_pages_with_repeated_skus_stop_crawl(tmp_path):
+    path = tmp_path / "out.ndjson"
+    transport = FlakyTransport(tmp_path, aliases={3: 1, 4: 2, 5: 1})
+    result = await crawl(transport, path, stop_after_stale=3)
+    assert result["stopped_early"]
+    assert result["failed_pages"] == []
+    assert result["total_items"] == 24
+    assert result["loaded_pages"] == 5